@@ -0,0 +1,96 @@
+import weakref
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Hashable, NamedTuple, Sequence
+import numpy as np
+from lukefi.metsi.data.enums.internal import TreeSpecies
+from lukefi.metsi.forestry.cross_cutting.cross_cutting import _cross_cut_species_mapper, cross_cut, price_table_digest
+
+
+class CrossCutCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class CrossCutCache:
+    """
+    Bounded least recently used cache of cross-cut results.
+
+    Trees are identified by their cross-cutting species, their breast height diameter quantised to :dbh_resolution:
+    (cm) and their height rounded to an integer meter, as the cross-cut implementations do. The timber price table is
+    identified by its content, digested once per table object, so price tables should not be modified in place once
+    used. On a miss the tree is cross-cut with the quantised diameter, rounded to the decimals of :dbh_resolution:, so
+    that the cached result does not depend on which of the trees sharing a key was cross-cut first.
+    """
+
+    def __init__(self, maxsize: int = 100000, dbh_resolution: float = 0.1):
+        if maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        if dbh_resolution <= 0:
+            raise ValueError("dbh_resolution must be a positive number")
+        self.maxsize = maxsize
+        self.dbh_resolution = dbh_resolution
+        self._dbh_ndigits = max(-Decimal(str(dbh_resolution)).as_tuple().exponent, 0)
+        self._digests: dict[int, tuple[weakref.ref, bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results: OrderedDict[Hashable, tuple[np.ndarray, np.ndarray, np.ndarray]] = OrderedDict()
+
+    def cross_cut(
+            self,
+            species: TreeSpecies,
+            breast_height_diameter: float,
+            height: float,
+            P: np.ndarray,
+            div=10,
+            impl: str = "py"
+            ) -> tuple[Sequence[int], Sequence[float], Sequence[float]]:
+        """ Cached equivalent of cross_cutting.cross_cut. The returned arrays are shared and read-only. """
+        if breast_height_diameter is None or breast_height_diameter <= 0:
+            return cross_cut(species, breast_height_diameter, height, P, div, impl)
+        q = max(round(breast_height_diameter / self.dbh_resolution), 1)
+        key = (self._species_key(species, impl), q, round(height), self._price_table_digest(P), div, impl)
+        result = self._results.get(key)
+        if result is not None:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return result
+        self.misses += 1
+        result = tuple(self._readonly(x) for x in cross_cut(species, round(q * self.dbh_resolution, self._dbh_ndigits), height, P, div, impl))
+        self._results[key] = result
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def cache_info(self) -> CrossCutCacheInfo:
+        return CrossCutCacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._results))
+
+    def cache_clear(self) -> None:
+        self._results.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def _price_table_digest(self, P: np.ndarray) -> bytes:
+        entry = self._digests.get(id(P))
+        if entry is not None and entry[0]() is P:
+            return entry[1]
+        digest = price_table_digest(P)
+        self._digests[id(P)] = (weakref.ref(P, lambda _, k=id(P): self._digests.pop(k, None)), digest)
+        return digest
+
+    @staticmethod
+    def _species_key(species: TreeSpecies, impl: str) -> Hashable:
+        # the Lua implementations select the taper curve and its correction by species code, not by species group
+        if impl in ("fhk", "lua", "lupa"):
+            return species
+        return _cross_cut_species_mapper.get(species, "birch")
+
+    @staticmethod
+    def _readonly(x: Sequence) -> np.ndarray:
+        arr = np.array(x)
+        arr.setflags(write=False)
+        return arr
@@ -0,0 +1,111 @@
+from pathlib import Path
+from typing import Optional, Sequence, Union
+import numpy as np
+from lukefi.metsi.data.enums.internal import TreeSpecies
+from lukefi.metsi.forestry.cross_cutting.cross_cutting import cross_cut_many
+
+TABLE_SPECIES = ("pine", "spruce", "birch")
+_table_species_representatives = (TreeSpecies.PINE, TreeSpecies.SPRUCE, TreeSpecies.SILVER_BIRCH)
+
+DEFAULT_DBH_GRID = np.arange(1.0, 80.5, 0.5)
+DEFAULT_HEIGHTS = np.arange(2, 41)
+
+
+class CrossCutTable:
+    """
+    Precomputed cross-cut volumes and values by timber grade for a timber price table and segment length :div:.
+
+    The grid holds the Python cross-cut results of each cross-cutting species (see TABLE_SPECIES) at the given
+    breast height diameters (cm) and integer heights (m), with shape (2, n_species, n_dbh, n_heights, n_grades). The
+    first axis separates volumes from values.
+
+    Lookups interpolate linearly over the diameter at the rounded height, rather than bilinearly over the diameter and
+    the height. The cross-cut implementations round the height to an integer meter before cross-cutting, so the exact
+    result of a tree is the one of its rounded height row, and interpolating between two height rows would move the
+    lookup away from the exact result. Trees whose rounded height is not one of :heights: are outside the table.
+    """
+
+    def __init__(self, P: np.ndarray, div: int, dbh_grid: np.ndarray, heights: np.ndarray, grid: np.ndarray):
+        self.P = P
+        self.div = div
+        self.dbh_grid = dbh_grid
+        self.heights = heights
+        self.grid = grid
+        self.nas = np.unique(P[:, 0])
+
+    @classmethod
+    def build(
+            cls,
+            P: np.ndarray,
+            div: int = 10,
+            dbh_grid: np.ndarray = DEFAULT_DBH_GRID,
+            heights: np.ndarray = DEFAULT_HEIGHTS
+            ) -> 'CrossCutTable':
+        dbh_grid = np.asarray(dbh_grid, dtype=float)
+        heights = np.asarray(heights, dtype=int)
+        if len(dbh_grid) < 2 or np.any(np.diff(dbh_grid) <= 0) or dbh_grid[0] <= 0:
+            raise ValueError("dbh_grid must be an increasing sequence of at least two positive diameters")
+        if len(heights) < 1 or np.any(np.diff(heights) <= 0) or heights[0] < 2:
+            raise ValueError("heights must be an increasing sequence of integer heights of at least 2 meters")
+        nas = np.unique(P[:, 0])
+        grid = np.zeros((2, len(TABLE_SPECIES), len(dbh_grid), len(heights), len(nas)))
+        d, h = np.meshgrid(dbh_grid, heights, indexing="ij")
+        for k, species in enumerate(_table_species_representatives):
+            grades, volumes, values = cross_cut_many([species]*d.size, d.ravel(), h.ravel(), P, div, "py")
+            columns = np.searchsorted(grades, nas)
+            grid[0, k] = volumes[:, columns].reshape(d.shape + (len(nas),))
+            grid[1, k] = values[:, columns].reshape(d.shape + (len(nas),))
+        return cls(P, div, dbh_grid, heights, grid)
+
+    def lookup_many(
+            self,
+            species_strings: Sequence[str],
+            breast_height_diameter: Sequence[float],
+            height: Sequence[float]
+            ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns a mask of the trees covered by the table, and dense (n_trees x n_grades) matrices of the interpolated
+        volumes and values. Rows of trees outside the table are zero.
+        """
+        species = np.array([TABLE_SPECIES.index(s) for s in species_strings], dtype=int)
+        dbh = np.asarray(breast_height_diameter, dtype=float)
+        height = np.round(np.asarray(height, dtype=float))
+        hi = np.searchsorted(self.heights, height)
+        found = (dbh >= self.dbh_grid[0]) & (dbh <= self.dbh_grid[-1]) & (hi < len(self.heights))
+        found[found] = self.heights[hi[found]] == height[found]
+        volumes = np.zeros((len(dbh), len(self.nas)))
+        values = np.zeros((len(dbh), len(self.nas)))
+        if np.any(found):
+            s, d, h = species[found], dbh[found], hi[found]
+            di = np.clip(np.searchsorted(self.dbh_grid, d, side="right") - 1, 0, len(self.dbh_grid) - 2)
+            w = ((d - self.dbh_grid[di]) / (self.dbh_grid[di+1] - self.dbh_grid[di]))[:, None]
+            lower = self.grid[:, s, di, h]
+            upper = self.grid[:, s, di+1, h]
+            interpolated = (1 - w) * lower + w * upper
+            volumes[found] = interpolated[0]
+            values[found] = interpolated[1]
+        return found, volumes, values
+
+    def lookup(self, species_string: str, breast_height_diameter: float, height: float) -> Optional[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """ Returns the interpolated unique timber grades, volumes and values of a tree, or None if the tree is outside the table. """
+        found, volumes, values = self.lookup_many([species_string], [breast_height_diameter], [height])
+        if not found[0]:
+            return None
+        return self.nas, volumes[0], values[0]
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Writes the grid to <path>.npy and the price table and axes to <path>.npz. The grid file can be memory mapped
+        by load, so that worker processes share the pages of a single table.
+        """
+        path = Path(path)
+        np.save(path.with_suffix(".npy"), self.grid)
+        np.savez(path.with_suffix(".npz"), P=self.P, div=self.div, dbh_grid=self.dbh_grid, heights=self.heights)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap_mode: Optional[str] = "r") -> 'CrossCutTable':
+        path = Path(path)
+        with np.load(path.with_suffix(".npz")) as meta:
+            P, div, dbh_grid, heights = meta["P"], int(meta["div"]), meta["dbh_grid"], meta["heights"]
+        grid = np.load(path.with_suffix(".npy"), mmap_mode=mmap_mode)
+        return cls(P, div, dbh_grid, heights, grid)
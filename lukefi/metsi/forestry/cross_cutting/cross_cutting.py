@@ -1,9 +1,10 @@
-from typing import Callable, Sequence
+import hashlib
+from typing import Any, Callable, Optional, Sequence
 import numpy as np
 from lukefi.metsi.data.enums.internal import TreeSpecies
 from lukefi.metsi.forestry.cross_cutting import stem_profile
-from lukefi.metsi.forestry.cross_cutting.cross_cutting_fhk import cross_cut_fhk
-from lukefi.metsi.forestry.cross_cutting.cross_cutting_lupa import cross_cut_lupa
+from lukefi.metsi.forestry.cross_cutting.cross_cutting_fhk import cross_cut_fhk, cross_cut_fhk_many
+from lukefi.metsi.forestry.cross_cutting.cross_cutting_lupa import cross_cut_lupa, cross_cut_lupa_many
 
 _cross_cut_species_mapper = {
     TreeSpecies.PINE: "pine",
@@ -16,6 +17,8 @@ _cross_cut_species_mapper = {
 ZERO_DIAMETER_DEFAULTS = ([3], [0.000045], [20])  # energy wood, m3, €/m3; values from Reijo Mykkänen
 CrossCutFn = Callable[..., tuple[Sequence[int], Sequence[float], Sequence[float]]]
 
+_cross_cut_tables: dict[tuple[bytes, int], Any] = {}
+
 
 def apteeraus_Nasberg(T: np.ndarray, P: np.ndarray, m: int, n: int, div: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
@@ -56,6 +59,60 @@ def apteeraus_Nasberg(T: np.ndarray, P: np.ndarray, m: int, n: int, div: int) ->
                         A[t] = P[j, 0]
                         L[t] = i
 
+    return _nasberg_assortments(V, C, A, L, P)
+
+
+def apteeraus_Nasberg_vectorised(T: np.ndarray, P: np.ndarray, m: int, n: int, div: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Equivalent of apteeraus_Nasberg, with the loops over segments and price table rows replaced by array operations.
+
+    The volumes, values and target segments of every (segment, price table row) pair are independent of the dynamic
+    program state, so they are computed up front. A start segment only updates segments at least the shortest log
+    length ahead of it, so all start segments within that distance are processed at once. The candidates are taken in
+    the order of the original loops, and a candidate wins its target segment if its total value exceeds the current
+    one and, among the candidates sharing the target, it has the largest value and comes first. This gives results
+    identical to apteeraus_Nasberg.
+    """
+    P = P[:m]
+    t = (np.arange(n)[:, None] + P[:, 2] / div).astype(int)
+    k = int(np.min(t - np.arange(n)[:, None])) if n > 0 else 1
+    if k < 1:
+        # targets may coincide with the start segment, which only the sequential loop handles
+        return apteeraus_Nasberg(T, P, m, n, div)
+
+    V = np.zeros(n)
+    C = np.zeros(n)
+    A = np.zeros(n)
+    L = np.zeros(n)
+
+    valid = t < n
+    t[~valid] = 0
+    valid &= T[t, 0] >= P[:, 1]
+    v = T[t, 2] - T[:, 2, None]
+    c = np.where(valid, v * P[:, 3], -np.inf)
+
+    for i0 in range(0, n, k):
+        tb = t[i0:i0+k]
+        c_tot = c[i0:i0+k] + C[i0:i0+k, None]
+        f = np.flatnonzero(c_tot > C[tb])
+        if len(f) == 0:
+            continue
+        tf = tb.flat[f]
+        cf = c_tot.flat[f]
+        winners = np.lexsort((f, -cf, tf))
+        winners = winners[np.r_[True, tf[winners][1:] != tf[winners][:-1]]]
+        f, tf, cf = f[winners], tf[winners], cf[winners]
+        i, j = i0 + f // m, f % m
+        V[tf] = v[i, j] + V[i]
+        C[tf] = cf
+        A[tf] = P[j, 0]
+        L[tf] = i
+
+    return _nasberg_assortments(V, C, A, L, P)
+
+
+def _nasberg_assortments(V: np.ndarray, C: np.ndarray, A: np.ndarray, L: np.ndarray, P: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Backtracks the optimal bucking from the dynamic program tables into volumes and values by timber grade. """
     maxi = np.argmax(C)
 
     nas = np.unique(P[:, 0])
@@ -76,17 +133,24 @@ def apteeraus_Nasberg(T: np.ndarray, P: np.ndarray, m: int, n: int, div: int) ->
     return (nas, volumes, values) #deviating from the R implementation a little bit by also returning `nas`, the list of unique timber grades.
 
 
-def cross_cut_py(timber_price_table, div = 10) -> CrossCutFn:
+def cross_cut_py(timber_price_table, div = 10, profiles: Optional[stem_profile.StemProfileCache] = None) -> CrossCutFn:
+    """
+    Produce a cross-cut wrapper function using the Python implementation. If a stem profile cache :profiles: is given,
+    the stem profiles are read from it.
+    """
     def cc(species: TreeSpecies, breast_height_diameter, height):
         species_string = _cross_cut_species_mapper.get(species, "birch") #birch is used as the default species in cross cutting
         #the original cross-cut scripts rely on the height being an integer, thus rounding.
         height = round(height)
         n = int((height*100)/div-1)
-        T = stem_profile.create_tree_stem_profile(species_string, breast_height_diameter, height, n)
+        if profiles is None:
+            T = stem_profile.create_tree_stem_profile(species_string, breast_height_diameter, height, n)
+        else:
+            T = profiles.get(species_string, breast_height_diameter, height, n)
         P = timber_price_table
         m = P.shape[0]
 
-        return apteeraus_Nasberg(T, P, m, n, div)
+        return apteeraus_Nasberg_vectorised(T, P, m, n, div)
     return cc
 
 
@@ -96,21 +160,138 @@ def cross_cut(
         height: float,
         P: np.ndarray,
         div=10,
-        impl: str = "py"
+        impl: str = "py",
+        profiles: Optional[stem_profile.StemProfileCache] = None
         ) -> tuple[Sequence[int], Sequence[float], Sequence[float]]:
     """
     Returns a tuple containing unique timber grades and their respective volumes and values.
     If :breast_height_diameter: is 0 or none, the Nasberg cross-cutting algorithm can't be applied.
     In this case, returns hardcoded constants.
+
+    :impl: selects the implementation: "py" (default), "lupa", "fhk" (or "lua") or "table". The "table" implementation
+    interpolates the results from a precomputed table registered with register_cross_cut_table, falling back to "py".
+    The Python implementation reads the stem profiles from the stem profile cache :profiles:, if given.
     """
     if breast_height_diameter is not None and breast_height_diameter < 0:
         raise ValueError("breast_height_diameter must be a non-negative number")
     if breast_height_diameter in (None, 0):
         return ZERO_DIAMETER_DEFAULTS
-    if impl in ("fhk", "lua"):
-        cc = cross_cut_fhk(tuple(P[:, 0]), tuple(P[:, 1]), tuple(P[:, 2]), tuple(P[:, 3]), P.shape[0], div, tuple(np.unique(P[:, 0])))
+    cc = _cross_cut_fn(P, div, impl, profiles)
+    return cc(species, breast_height_diameter, height)
+
+
+def price_table_digest(P: np.ndarray) -> bytes:
+    """ Content based digest of a timber price table. """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str((P.shape, P.dtype.str)).encode())
+    h.update(np.ascontiguousarray(P).tobytes())
+    return h.digest()
+
+
+def register_cross_cut_table(table) -> None:
+    """
+    Registers a precomputed cross_cut_table.CrossCutTable to serve impl="table" cross-cuts with the same price table
+    content and div.
+    """
+    _cross_cut_tables[(price_table_digest(table.P), table.div)] = table
+
+
+def cross_cut_tabulated(P: np.ndarray, div: int = 10, profiles: Optional[stem_profile.StemProfileCache] = None) -> CrossCutFn:
+    """
+    Produce a cross-cut wrapper function reading the results from the cross-cut table registered for :P: and :div:.
+    Trees outside the table, or all trees if no table has been registered, are cross-cut with the Python implementation.
+    """
+    table = _cross_cut_tables.get((price_table_digest(P), div))
+    exact = cross_cut_py(P, div, profiles)
+
+    def cc(species: TreeSpecies, breast_height_diameter, height):
+        result = None
+        if table is not None:
+            result = table.lookup(_cross_cut_species_mapper.get(species, "birch"), breast_height_diameter, height)
+        return exact(species, breast_height_diameter, height) if result is None else result
+    return cc
+
+
+def _cross_cut_fn(P: np.ndarray, div: int, impl: str, profiles: Optional[stem_profile.StemProfileCache] = None) -> CrossCutFn:
+    if impl == "table":
+        return cross_cut_tabulated(P, div, profiles)
+    elif impl in ("fhk", "lua"):
+        return cross_cut_fhk(tuple(P[:, 0]), tuple(P[:, 1]), tuple(P[:, 2]), tuple(P[:, 3]), P.shape[0], div, tuple(np.unique(P[:, 0])))
     elif impl == "lupa":
-        cc = cross_cut_lupa(tuple(P[:, 0]), tuple(P[:, 1]), tuple(P[:, 2]), tuple(P[:, 3]), P.shape[0], div, tuple(np.unique(P[:, 0])))
+        return cross_cut_lupa(tuple(P[:, 0]), tuple(P[:, 1]), tuple(P[:, 2]), tuple(P[:, 3]), P.shape[0], div, tuple(np.unique(P[:, 0])))
+    elif impl == "py":
+        return cross_cut_py(P, div, profiles)
     else:
-        cc = cross_cut_py(P, div)
-    return cc(species, breast_height_diameter, height)
+        raise ValueError(f"unknown cross-cut implementation {impl!r}")
+
+
+def _cross_cut_many_fn(P: np.ndarray, div: int, impl: str) -> CrossCutFn:
+    """ Batch cross-cut function of the Lua implementations "lupa" and "fhk" (or "lua"). """
+    if impl == "lupa":
+        factory = cross_cut_lupa_many
+    elif impl in ("fhk", "lua"):
+        factory = cross_cut_fhk_many
+    else:
+        raise ValueError(f"unknown batch cross-cut implementation {impl!r}")
+    return factory(tuple(P[:, 0]), tuple(P[:, 1]), tuple(P[:, 2]), tuple(P[:, 3]), P.shape[0], div, tuple(np.unique(P[:, 0])))
+
+
+def cross_cut_many(
+        species: Sequence[TreeSpecies],
+        breast_height_diameter: Sequence[float],
+        height: Sequence[float],
+        P: np.ndarray,
+        div=10,
+        impl: str = "py",
+        profiles: Optional[stem_profile.StemProfileCache] = None
+        ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Cross-cuts a batch of trees given as equal length sequences (or arrays) of species, diameters and heights.
+    With impl="table", the trees covered by the registered cross-cut table are looked up in one go, with
+    impl="lupa" the whole batch is cross-cut in a single call to Lua, and with impl="fhk" the batch is solved with
+    shared FHK memory arenas.
+
+    Returns a tuple containing the timber grades and dense (n_trees x n_grades) matrices of volumes and values, where
+    row i holds the volumes and values of tree i by timber grade. The timber grades are the unique grades of :P: and
+    the energy wood grade of ZERO_DIAMETER_DEFAULTS, so that trees with a diameter of 0 or None are reported in the same
+    matrices as the others.
+    """
+    species = np.asarray(species).tolist()
+    dbh = np.asarray(breast_height_diameter, dtype=float)
+    height = np.asarray(height, dtype=float)
+    if np.any(dbh < 0):
+        raise ValueError("breast_height_diameter must be a non-negative number")
+
+    nas = np.unique(P[:, 0])
+    grades = np.union1d(nas, ZERO_DIAMETER_DEFAULTS[0])
+    columns = np.searchsorted(grades, nas)
+    volumes = np.zeros((len(dbh), len(grades)))
+    values = np.zeros((len(dbh), len(grades)))
+
+    zero = np.isnan(dbh) | (dbh == 0)
+    zero_column = np.searchsorted(grades, ZERO_DIAMETER_DEFAULTS[0][0])
+    volumes[zero, zero_column] = ZERO_DIAMETER_DEFAULTS[1][0]
+    values[zero, zero_column] = ZERO_DIAMETER_DEFAULTS[2][0]
+
+    rows = np.flatnonzero(~zero)
+    table = _cross_cut_tables.get((price_table_digest(P), div)) if impl == "table" else None
+    if table is not None:
+        species_strings = [_cross_cut_species_mapper.get(species[i], "birch") for i in rows]
+        found, vol, val = table.lookup_many(species_strings, dbh[rows], height[rows])
+        volumes[np.ix_(rows[found], columns)] = vol[found]
+        values[np.ix_(rows[found], columns)] = val[found]
+        rows = rows[~found]
+
+    if impl in ("fhk", "lua", "lupa"):
+        cc_many = _cross_cut_many_fn(P, div, impl)
+        _, vol, val = cc_many([species[i] for i in rows], dbh[rows], height[rows])
+        volumes[np.ix_(rows, columns)] = vol
+        values[np.ix_(rows, columns)] = val
+        return grades, volumes, values
+
+    cc = _cross_cut_fn(P, div, "py" if impl == "table" else impl, profiles)
+    for i in rows:
+        _, vol, val = cc(species[i], dbh[i], height[i])
+        volumes[i, columns] = vol
+        values[i, columns] = val
+    return grades, volumes, values
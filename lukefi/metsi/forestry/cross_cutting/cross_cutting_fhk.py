@@ -1,9 +1,11 @@
 from dataclasses import dataclass, field, fields, make_dataclass
 from functools import cache
 from json import dumps
+import operator
 from pathlib import Path
 from typing import Callable, Iterable, Optional, Sequence
 from lukefi.metsi.data.model import TreeSpecies
+import numpy as np
 import fhk
 
 CrossCutFn = Callable[..., tuple[Sequence[int], Sequence[float], Sequence[float]]]
@@ -64,8 +66,8 @@ def queryclass(retnames: Iterable[str]) -> type:
 
 
 @cache
-def cross_cut_fhk(pcls, ptop, plen, pval, m, div, nas) -> CrossCutFn:
-    """Produce a cross-cut wrapper function intialized with the crosscut.lua script in the FHK graph solver."""
+def _fhk_query(pcls, ptop, plen, pval, m, div, nas) -> tuple[Callable, list[str]]:
+    """Build the FHK graph with the crosscut.lua model and return its compiled query and the names of the query results."""
     retnames = []
     for v in nas:
         retnames.append(f"val{int(v)}")
@@ -74,6 +76,13 @@ def cross_cut_fhk(pcls, ptop, plen, pval, m, div, nas) -> CrossCutFn:
         definevars(g)
         defineapt(g, pcls, ptop, plen, pval, m, div, nas, retnames)
         query = g.query(queryclass(retnames))
+    return query, retnames
+
+
+@cache
+def cross_cut_fhk(pcls, ptop, plen, pval, m, div, nas) -> CrossCutFn:
+    """Produce a cross-cut wrapper function intialized with the crosscut.lua script in the FHK graph solver."""
+    query, retnames = _fhk_query(pcls, ptop, plen, pval, m, div, nas)
 
     def cc(
         spe: TreeSpecies,
@@ -88,3 +97,40 @@ def cross_cut_fhk(pcls, ptop, plen, pval, m, div, nas) -> CrossCutFn:
             val.append(getattr(r, retnames[i+1]))
         return nas, vol, val # type: ignore
     return cc
+
+
+@cache
+def cross_cut_fhk_many(pcls, ptop, plen, pval, m, div, nas, mem_trees: int = 1024) -> CrossCutFn:
+    """
+    Produce a batch cross-cut wrapper function intialized with the crosscut.lua script in the FHK graph solver.
+
+    The trees of a batch are solved with the compiled query of cross_cut_fhk. Instead of a fresh arena per tree, an
+    fhk.Mem arena is shared by the queries of up to :mem_trees: consecutive trees, and the results are collected
+    directly into (n_trees x n_grades) volume and value arrays.
+
+    Sharing an arena without resetting it between trees is safe, because each query solves a new instance allocated
+    in the arena from the given spe, d and h only, and its results are copied into the arrays before the next query.
+    Nothing of an earlier instance is read by a later one, so the arena only accumulates memory, which is bounded by
+    replacing it after :mem_trees: trees. An arena given as :mem: is used for the whole batch and is left to the
+    caller to release.
+    """
+    query, retnames = _fhk_query(pcls, ptop, plen, pval, m, div, nas)
+    # there are two results per grade, so the getter always returns a tuple
+    results = operator.attrgetter(*retnames)
+
+    def cc(
+        spe: Sequence[TreeSpecies],
+        d: Sequence[float],
+        h: Sequence[float],
+        mem: Optional[fhk.Mem] = None
+    ) -> tuple[Sequence[int], np.ndarray, np.ndarray]:
+        spe = np.asarray(spe).tolist()
+        d = np.asarray(d, dtype=float).tolist()
+        h = np.rint(np.asarray(h, dtype=float)).astype(int).tolist()
+        out = np.zeros((len(d), len(retnames)))
+        for start in range(0, len(d), mem_trees):
+            arena = fhk.Mem() if mem is None else mem
+            for i in range(start, min(start + mem_trees, len(d))):
+                out[i] = results(query(Args(spe=spe[i], d=d[i], h=h[i]), mem=arena))
+        return nas, out[:, 0::2], out[:, 1::2]
+    return cc
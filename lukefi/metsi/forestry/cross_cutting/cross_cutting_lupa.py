@@ -2,6 +2,7 @@ from functools import cache
 from typing import Callable, Sequence
 
 import lupa
+import numpy as np
 from lukefi.metsi.data.enums.internal import TreeSpecies
 
 from pathlib import Path
@@ -9,16 +10,21 @@ from pathlib import Path
 CrossCutFn = Callable[..., tuple[Sequence[int], Sequence[float], Sequence[float]]]
 
 
-@cache
-def cross_cut_lupa(_pcls, _ptop, _plen, _pval, m, div, nas):
-    """Produce a cross-cut wrapper function intialized with the crosscut.lua script using the Lupa bindings."""
+def _crosscut_module(lua: lupa.LuaRuntime):
+    """Executes the crosscut.lua script in the given Lua runtime and returns the module table."""
     path = Path(__file__).parent.parent.resolve() / "lua" / "crosscut.lua"
 
     with open(path, "r") as file:
         script = file.read()
 
+    return lua.execute(script)
+
+
+@cache
+def cross_cut_lupa(_pcls, _ptop, _plen, _pval, m, div, nas):
+    """Produce a cross-cut wrapper function intialized with the crosscut.lua script using the Lupa bindings."""
     lua = lupa.LuaRuntime(unpack_returned_tuples=True)
-    fn = lua.execute(script)['aptfunc_lupa']
+    fn = _crosscut_module(lua)['aptfunc_lupa']
     _pcls = lua.table_from(_pcls)
     _ptop = lua.table_from(_ptop)
     _plen = lua.table_from(_plen)
@@ -33,3 +39,44 @@ def cross_cut_lupa(_pcls, _ptop, _plen, _pval, m, div, nas):
         vol, val = aptfunc(spe, d, round(h))
         return list(map(int, nas)), list(vol.values()), list(val.values())
     return cc
+
+
+# largest number of results returned by a single call of the batch function, within the Lua stack limit
+MAX_BATCH_RESULTS = 2**16
+
+
+@cache
+def cross_cut_lupa_many(_pcls, _ptop, _plen, _pval, m, div, nas):
+    """
+    Produce a batch cross-cut wrapper function intialized with the crosscut.lua script using the Lupa bindings.
+    A batch of trees crosses the Python-Lua boundary in a single call, which returns the results of all trees as one
+    flat tuple. Batches larger than MAX_BATCH_RESULTS results are cross-cut in several calls.
+    """
+    lua = lupa.LuaRuntime(unpack_returned_tuples=True)
+    fn = _crosscut_module(lua)['aptfunc_lupa_many']
+    _pcls = lua.table_from(_pcls)
+    _ptop = lua.table_from(_ptop)
+    _plen = lua.table_from(_plen)
+    _pval = lua.table_from(_pval)
+    aptfunc = fn(_pcls, _ptop, _plen, _pval, m, div, len(nas))
+    batch = max(MAX_BATCH_RESULTS // (2 * len(nas)), 1)
+
+    def cc(
+            spe: Sequence[TreeSpecies],
+            d: Sequence[float],
+            h: Sequence[float]
+    ) -> tuple[list[int], np.ndarray, np.ndarray]:
+        spe = np.asarray(spe).tolist()
+        d = np.asarray(d, dtype=float).tolist()
+        h = np.rint(np.asarray(h, dtype=float)).astype(int).tolist()
+        results = np.empty((len(d), 2, len(nas)))
+        for start in range(0, len(d), batch):
+            stop = min(start + batch, len(d))
+            out = aptfunc(
+                stop - start,
+                lua.table_from(spe[start:stop]),
+                lua.table_from(d[start:stop]),
+                lua.table_from(h[start:stop]))
+            results[start:stop] = np.array(out, dtype=float).reshape(stop - start, 2, len(nas))
+        return list(map(int, nas)), np.ascontiguousarray(results[:, 0]), np.ascontiguousarray(results[:, 1])
+    return cc
@@ -1,8 +1,9 @@
 import math
 import statistics
 from enum import Enum
+import numpy as np
 from lukefi.metsi.data.model import ReferenceTree, ForestStand
-from typing import List, Callable, Optional
+from typing import List, Callable, NamedTuple, Optional, Sequence
 
 
 def compounded_growth_factor(growth_percent: float, years: int) -> float:
@@ -97,3 +98,202 @@ def mean_age_stand(stand: ForestStand) -> float:
         mean_age = 0
     return mean_age
 
+
+class TreeArrays:
+    """ Columnar view of reference trees. Missing numeric values are NaN.
+
+    The species are stored as codes into :species_values:, the distinct species in order of their first appearance.
+    """
+    __slots__ = (
+        "breast_height_diameter", "height", "stems_per_ha", "biological_age", "species_codes", "species_values")
+
+    def __init__(self,
+                 breast_height_diameter: np.ndarray,
+                 height: np.ndarray,
+                 stems_per_ha: np.ndarray,
+                 biological_age: np.ndarray,
+                 species_codes: np.ndarray,
+                 species_values: list):
+        self.breast_height_diameter = breast_height_diameter
+        self.height = height
+        self.stems_per_ha = stems_per_ha
+        self.biological_age = biological_age
+        self.species_codes = species_codes
+        self.species_values = species_values
+
+    @classmethod
+    def from_trees(cls, trees: Sequence[ReferenceTree]) -> 'TreeArrays':
+        def column(attr: str) -> np.ndarray:
+            return np.array([getattr(rt, attr) for rt in trees], dtype=float)
+        codes = {}
+        species_codes = np.array([codes.setdefault(rt.species, len(codes)) for rt in trees], dtype=int)
+        return cls(
+            column("breast_height_diameter"),
+            column("height"),
+            column("stems_per_ha"),
+            column("biological_age"),
+            species_codes,
+            list(codes))
+
+    def __len__(self) -> int:
+        return len(self.stems_per_ha)
+
+    def basal_area(self) -> np.ndarray:
+        """ Basal areas (m^2) of the reference trees, see calculate_basal_area """
+        radius = self.breast_height_diameter * 0.5 * 0.01
+        return math.pi * np.power(radius, 2) * self.stems_per_ha
+
+
+def _sequential_sum(x: np.ndarray) -> float:
+    """ Sum of x added up in order, equal to the builtin sum unlike the pairwise np.sum """
+    return float(np.cumsum(x)[-1]) if len(x) > 0 else 0
+
+
+def overall_basal_area_arrays(trees: TreeArrays) -> float:
+    """ overall_basal_area of TreeArrays """
+    return _sequential_sum(trees.basal_area())
+
+
+def overall_stems_per_ha_arrays(trees: TreeArrays) -> float:
+    """ overall_stems_per_ha of TreeArrays """
+    return _sequential_sum(trees.stems_per_ha)
+
+
+def solve_dominant_species_arrays(trees: TreeArrays) -> Optional[Enum]:
+    """ solve_dominant_species of TreeArrays. Ties are resolved to the species that appears first. """
+    if len(trees) == 0:
+        return None
+    bucket = np.bincount(trees.species_codes, trees.basal_area(), minlength=len(trees.species_values))
+    return trees.species_values[int(np.argmax(bucket))]
+
+
+def solve_dominant_height_arrays(trees: TreeArrays) -> float:
+    """ solve_dominant_height of TreeArrays. Raises statistics.StatisticsError for no trees. """
+    if len(trees) == 0:
+        raise statistics.StatisticsError("no median for empty data")
+    return float(np.median(trees.height))
+
+
+def calculate_basal_area_weighted_attribute_sum_arrays(trees: TreeArrays, attribute: np.ndarray) -> float:
+    """ Basal area weighted mean of a reference tree attribute given as an array, e.g. trees.height. Equals
+    calculate_basal_area_weighted_attribute_sum with f = lambda x: attribute(x) * calculate_basal_area(x).
+    """
+    basal_area = trees.basal_area()
+    return _sequential_sum(attribute * basal_area) / _sequential_sum(basal_area)
+
+
+def mean_age_arrays(trees: TreeArrays) -> float:
+    """ mean_age_stand of TreeArrays """
+    stems = overall_stems_per_ha_arrays(trees)
+    if stems > 0:
+        return _sequential_sum(trees.stems_per_ha * trees.biological_age) / stems
+    return 0
+
+
+def solve_dominant_height_c_largest_arrays(trees: TreeArrays, c: int = 100) -> float:
+    """ solve_dominant_height_c_largest of TreeArrays.
+
+    Instead of sorting all trees, the largest trees are selected with np.argpartition until they hold at least :c:
+    stems, and only these candidates are sorted. The candidates always include all trees with the same diameter as
+    the smallest candidate, so that they are a prefix of the full stable sort and the result is the same.
+    """
+    return _c_largest_select(trees.breast_height_diameter, trees.stems_per_ha, c)
+
+
+def solve_dominant_height_c_largest_many(
+        breast_height_diameter: Sequence[float],
+        stems_per_ha: Sequence[float],
+        offsets: Sequence[int],
+        c: int = 100) -> np.ndarray:
+    """ solve_dominant_height_c_largest of many stands, whose trees are given as concatenated arrays of diameters and
+    stems per hectare. The trees of stand i are those in [offsets[i], offsets[i+1]).
+
+    Each stand is solved with the selection of solve_dominant_height_c_largest_arrays on its slice of the arrays, so
+    only the largest trees of a stand are sorted.
+    """
+    d = np.asarray(breast_height_diameter, dtype=float)
+    w = np.asarray(stems_per_ha, dtype=float)
+    offsets = np.asarray(offsets, dtype=int)
+    counts = np.diff(offsets)
+    if offsets[0] != 0 or offsets[-1] != len(d) or np.any(counts < 0):
+        raise ValueError("offsets must be an increasing sequence from 0 to the number of trees")
+    return np.array([_c_largest_select(d[start:end], w[start:end], c) for start, end in zip(offsets[:-1], offsets[1:])],
+                    dtype=float)
+
+
+def _c_largest_select(d: np.ndarray, w: np.ndarray, c: int) -> float:
+    k = min(len(d), 16)
+    while True:
+        if k >= len(d):
+            candidates = np.arange(len(d))
+        else:
+            threshold = d[np.argpartition(-d, k-1)[:k]].min()
+            candidates = np.flatnonzero(d >= threshold)
+        order = candidates[np.argsort(-d[candidates], kind="stable")]
+        if len(candidates) == len(d) or np.cumsum(w[order])[-1] >= c:
+            return _c_largest_weighted_mean(d[order], w[order], c)
+        k *= 4
+
+
+def _c_largest_weighted_mean(d: np.ndarray, w: np.ndarray, c: int) -> float:
+    """ Accumulation of solve_dominant_height_c_largest over trees sorted by decreasing diameter """
+    n = np.cumsum(w)
+    dw_sum = np.cumsum(d * w)
+    reached = n >= c
+    if np.any(reached):
+        k = int(np.argmax(reached))
+        # notice only portion of stems as last weight
+        previous_n = n[k-1] if k > 0 else 0
+        previous_dw_sum = dw_sum[k-1] if k > 0 else 0
+        return (previous_dw_sum + d[k] * (c - previous_n)) / c
+    return dw_sum[-1] / n[-1] if len(d) > 0 and n[-1] > 0 else 0
+
+
+class SpeciesSummary(NamedTuple):
+    basal_area: float
+    mean_diameter: float
+    mean_height: float
+    mean_age: float
+
+
+class StandSummary(NamedTuple):
+    basal_area: float
+    stems_per_ha: float
+    dominant_species: Optional[Enum]
+    dominant_height: float
+    dominant_diameter_c_largest: float
+    mean_age: float
+    species: dict[Enum, SpeciesSummary]
+
+
+def stand_summary(stand: ForestStand, c: int = 100) -> StandSummary:
+    """ Stand aggregates computed together from a single pass over the reference trees.
+
+    The record holds overall_basal_area, overall_stems_per_ha, solve_dominant_species, solve_dominant_height (0 for a
+    stand without trees), solve_dominant_height_c_largest with :c: and mean_age_stand of the stand, and the basal area
+    and the basal area weighted mean diameter, height and age of each species.
+    """
+    trees = TreeArrays.from_trees(stand.reference_trees)
+    if len(trees) == 0:
+        return StandSummary(0, 0, None, 0, 0, 0, {})
+    basal_area = trees.basal_area()
+    stems = _sequential_sum(trees.stems_per_ha)
+    n_species = len(trees.species_values)
+    species_basal_area = np.bincount(trees.species_codes, basal_area, minlength=n_species)
+
+    def species_mean(attribute: np.ndarray) -> np.ndarray:
+        return np.bincount(trees.species_codes, attribute * basal_area, minlength=n_species) / species_basal_area
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = [species_mean(x) for x in (trees.breast_height_diameter, trees.height, trees.biological_age)]
+    return StandSummary(
+        basal_area=_sequential_sum(basal_area),
+        stems_per_ha=stems,
+        dominant_species=trees.species_values[int(np.argmax(species_basal_area))],
+        dominant_height=float(np.median(trees.height)),
+        dominant_diameter_c_largest=_c_largest_select(trees.breast_height_diameter, trees.stems_per_ha, c),
+        mean_age=_sequential_sum(trees.stems_per_ha * trees.biological_age) / stems if stems > 0 else 0,
+        species={
+            spe: SpeciesSummary(float(species_basal_area[i]), *(float(m[i]) for m in means))
+            for i, spe in enumerate(trees.species_values)
+        })
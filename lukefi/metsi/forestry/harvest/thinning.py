@@ -1,5 +1,9 @@
-from typing import Callable
+import math
+from dataclasses import dataclass
+from typing import Callable, NamedTuple, Optional, Union
+import numpy as np
 from lukefi.metsi.data.model import ForestStand
+from lukefi.metsi.forestry import forestry_utils as futil
 
 def iterative_thinning(
         stand: ForestStand,
@@ -28,3 +32,182 @@ def iterative_thinning(
             rt.stems_per_ha *= thin_factor
 
     return stand
+
+
+@dataclass
+class ThinningState:
+    """ Stand aggregates maintained by incremental_thinning as stems are removed """
+    basal_area: float
+    stems_per_ha: float
+    removed_basal_area: float = 0.0
+    removed_stems_per_ha: float = 0.0
+    removed_volume: float = 0.0
+
+
+class BasalAreaBound(NamedTuple):
+    """ Thinning predicate that holds while the basal area of the stand (or ThinningState) exceeds :upper: """
+    upper: float
+
+    def __call__(self, stand: Union[ForestStand, ThinningState]) -> bool:
+        if isinstance(stand, ThinningState):
+            return self.upper < stand.basal_area
+        return self.upper < futil.overall_basal_area(stand.reference_trees)
+
+
+class StemCountBound(NamedTuple):
+    """ Thinning predicate that holds while the stems per hectare of the stand (or ThinningState) exceed :upper: """
+    upper: float
+
+    def __call__(self, stand: Union[ForestStand, ThinningState]) -> bool:
+        if isinstance(stand, ThinningState):
+            return self.upper < stand.stems_per_ha
+        return self.upper < futil.overall_stems_per_ha(stand.reference_trees)
+
+
+def thinning_factors(n: int, thinning_factor: float, extra_factor_solver: Callable) -> np.ndarray:
+    """ Per tree stem count factors applied on each iteration of iterative_thinning """
+    factors = np.array([thinning_factor + extra_factor_solver(i, n, thinning_factor) for i in range(n)], dtype=float)
+    factors[factors > 1.0] = 1.0
+    return factors
+
+
+def solve_thinning_iterations(
+        stems_per_ha: np.ndarray,
+        weights: np.ndarray,
+        factors: np.ndarray,
+        upper: float
+) -> int:
+    """ Estimates the number of iterations after which the weighted stem count sum(weights * stems_per_ha) of the
+    thinned trees no longer exceeds :upper:, when each iteration multiplies the stems by :factors:. The weights are the
+    basal areas of single stems for a basal area bound, and ones for a stem count bound.
+
+    With a single factor the iterations are solved in closed form, otherwise by bisection.
+    """
+    def value(t: int) -> float:
+        return float(np.sum(weights * stems_per_ha * np.power(factors, t)))
+
+    v0 = value(0)
+    if v0 <= upper:
+        return 0
+    if np.all(factors == factors[0]) and 0.0 < factors[0] < 1.0 and upper > 0:
+        return max(math.ceil(math.log(upper / v0) / math.log(factors[0])), 0)
+    lo, hi = 0, 1
+    while value(hi) > upper:
+        lo, hi = hi, 2 * hi
+        if hi > 2**20:
+            raise ValueError("thinning does not reach the bound")
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if value(mid) > upper:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+
+def thin_stem_arrays(
+        stems_per_ha: np.ndarray,
+        breast_height_diameter: np.ndarray,
+        factors: np.ndarray,
+        bound: Union[BasalAreaBound, StemCountBound]
+) -> np.ndarray:
+    """ Thins stem arrays as iterative_thinning with a monotone :bound: predicate, and returns the thinned stems.
+
+    The number of iterations is solved with solve_thinning_iterations. The stems are then thinned by repeated
+    multiplication and the bound is evaluated with sums in tree order as in iterative_thinning, stepping forward from
+    slightly before the estimate until the bound holds. This gives the same stems as the iterative loop without
+    evaluating the predicate on every iteration.
+    """
+    stems = np.array(stems_per_ha, dtype=float)
+    if isinstance(bound, BasalAreaBound):
+        weights = math.pi * np.power(np.asarray(breast_height_diameter, dtype=float) * 0.5 * 0.01, 2)
+    else:
+        weights = np.ones_like(stems)
+    if np.any(factors < 0):
+        raise ValueError("thinning factors must be non-negative")
+    limit = np.sum(weights * stems * (factors == 1.0))
+    if bound.upper < limit:
+        raise ValueError("thinning does not reach the bound")
+
+    def holds(s: np.ndarray) -> bool:
+        return bound.upper < futil._sequential_sum(weights * s)
+
+    start = max(solve_thinning_iterations(stems, weights, factors, bound.upper) - 2, 0)
+    thinned = stems.copy()
+    for _ in range(start - 1):
+        thinned *= factors
+    if start > 0:
+        if holds(thinned):
+            thinned *= factors
+        else:
+            # the estimate overshot, thin from the beginning
+            thinned = stems.copy()
+    while holds(thinned):
+        thinned *= factors
+    return thinned
+
+
+def analytic_thinning(
+        stand: ForestStand,
+        thinning_factor: float,
+        thin_predicate: Callable,
+        extra_factor_solver: Callable
+) -> ForestStand:
+    """ iterative_thinning that solves the thinning on stem arrays when :thin_predicate: is a BasalAreaBound or a
+    StemCountBound. Other predicates are evaluated with iterative_thinning.
+    """
+    if not isinstance(thin_predicate, (BasalAreaBound, StemCountBound)):
+        return iterative_thinning(stand, thinning_factor, thin_predicate, extra_factor_solver)
+    trees = stand.reference_trees
+    factors = thinning_factors(len(trees), thinning_factor, extra_factor_solver)
+    stems = thin_stem_arrays(
+        np.array([rt.stems_per_ha for rt in trees], dtype=float),
+        np.array([rt.breast_height_diameter for rt in trees], dtype=float),
+        factors,
+        thin_predicate)
+    for rt, f in zip(trees, stems):
+        rt.stems_per_ha = float(f)
+    return stand
+
+
+def incremental_thinning(
+        stand: ForestStand,
+        thinning_factor: float,
+        thin_predicate: Callable[[ThinningState], bool],
+        extra_factor_solver: Callable,
+        stem_volume: Optional[Callable] = None
+) -> tuple[ForestStand, ThinningState]:
+    """ iterative_thinning with a predicate of the ThinningState instead of the stand.
+
+    The state is computed once from the reference trees, and each removal of stems from a tree updates it with the
+    basal area and the volume of the removed stems, so that the predicate doesn't recompute the stand aggregates on
+    every iteration. Since the running sums are updated rather than recomputed, they may differ from the aggregates
+    of the thinned stand in the last bits.
+
+    :param stem_volume: (optional) Volume of a single stem of a reference tree, used for the removed volume
+    :return: the thinned stand and the final state
+    """
+    trees = stand.reference_trees
+    factors = thinning_factors(len(trees), thinning_factor, extra_factor_solver).tolist()
+    stem_basal_areas = [math.pi * math.pow(rt.breast_height_diameter * 0.5 * 0.01, 2) for rt in trees]
+    stem_volumes = [0.0 if stem_volume is None else stem_volume(rt) for rt in trees]
+    state = ThinningState(
+        basal_area=futil.overall_basal_area(trees),
+        stems_per_ha=futil.overall_stems_per_ha(trees))
+
+    while thin_predicate(state):
+        removed_total = 0.0
+        for rt, q, g, v in zip(trees, factors, stem_basal_areas, stem_volumes):
+            before = rt.stems_per_ha
+            rt.stems_per_ha *= q
+            removed = before - rt.stems_per_ha
+            removed_total += removed
+            state.stems_per_ha -= removed
+            state.basal_area -= g * removed
+            state.removed_stems_per_ha += removed
+            state.removed_basal_area += g * removed
+            state.removed_volume += v * removed
+        if removed_total == 0.0:
+            raise ValueError("thinning does not reach the bound")
+
+    return stand, state
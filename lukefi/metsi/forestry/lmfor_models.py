@@ -0,0 +1,149 @@
+""" The lmfor volume models of vol_mods_final_LM.rds evaluated with NumPy, without the embedded R of r_utils """
+import json
+from functools import cache
+from pathlib import Path
+from typing import Sequence
+import numpy as np
+from lukefi.metsi.data.enums.internal import TreeSpecies
+from lukefi.metsi.data.model import ForestStand
+
+VOLUME_MODEL_COEFFICIENTS = Path(__file__).parent / "r" / "vol_mods_final_LM_fixef.json"
+
+SPECIES = ("pine", "spruce", "birch")
+MODEL_TYPES = ("climbed", "felled", "scanned")
+
+lmfor_species_map = {
+    TreeSpecies.PINE: 'pine',
+    TreeSpecies.SHORE_PINE: 'pine',
+    TreeSpecies.OTHER_PINE: 'pine',
+    TreeSpecies.SPRUCE: 'spruce',
+    TreeSpecies.BLACK_SPRUCE: 'spruce',
+    TreeSpecies.OTHER_SPRUCE: 'spruce',
+    TreeSpecies.OTHER_CONIFEROUS: 'spruce',
+    TreeSpecies.CURLY_BIRCH: 'birch',
+    TreeSpecies.DOWNY_BIRCH: 'birch',
+    TreeSpecies.SILVER_BIRCH: 'birch',
+    TreeSpecies.OTHER_DECIDUOUS: 'birch'
+}
+
+
+@cache
+def volume_model_coefficients() -> dict:
+    """
+    Fixed effects of the volume models (model3 of vol_mods_final_LM.rds) by species, as exported from the R model
+    objects. Each model predicts the volvff parameters logita, a linear model whose terms are named as in R, and lambda.
+    """
+    with open(VOLUME_MODEL_COEFFICIENTS, "r") as file:
+        return json.load(file)["species"]
+
+
+def _term(name: str, dbh: np.ndarray, h: np.ndarray, temp_sum: np.ndarray, model_type: np.ndarray) -> np.ndarray:
+    """ Values of an R model term such as "I(1/h)", "temp_sum" or "dbh:datasetfelled". """
+    base = {
+        "(Intercept)": lambda: np.ones_like(dbh),
+        "I(1/h)": lambda: 1 / h,
+        "h": lambda: h,
+        "dbh": lambda: dbh,
+        "I(h * dbh)": lambda: h * dbh,
+        "I(1/(h * dbh))": lambda: 1 / (h * dbh),
+        "temp_sum": lambda: temp_sum,
+        "datasetfelled": lambda: (model_type == "felled").astype(float),
+        "datasetscanned": lambda: (model_type == "scanned").astype(float)
+    }
+    values = np.ones_like(dbh)
+    for factor in name.split(":"):
+        if factor not in base:
+            raise ValueError(f"unknown volume model term {factor}")
+        values = values * base[factor]()
+    return values
+
+
+def volume_model_parameters(
+        dbh: Sequence[float],
+        h: Sequence[float],
+        temp_sum: Sequence[float],
+        species: Sequence[str],
+        model_type: Sequence[str]
+        ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Population level (fixed effects) predictions of the volvff parameters logita and lambda for arrays of trees, as
+    lmfor::predvff computes them for the trees of computable_dataframe in lmfor_volume.R. :species: are lmfor species
+    strings (see lmfor_species_map) and :model_type: one of MODEL_TYPES for each tree.
+    """
+    dbh = np.asarray(dbh, dtype=float)
+    h = np.asarray(h, dtype=float)
+    temp_sum = np.broadcast_to(np.asarray(temp_sum, dtype=float), dbh.shape)
+    species = np.asarray(species)
+    model_type = np.broadcast_to(np.asarray(model_type), dbh.shape)
+    if not np.all(np.isin(species, SPECIES)) or not np.all(np.isin(model_type, MODEL_TYPES)):
+        raise ValueError(f"species must be one of {SPECIES} and model_type one of {MODEL_TYPES}")
+    logita = np.zeros_like(dbh)
+    lam = np.zeros_like(dbh)
+    for spe, coefficients in volume_model_coefficients().items():
+        rows = species == spe
+        if not np.any(rows):
+            continue
+        args = dbh[rows], h[rows], temp_sum[rows], model_type[rows]
+        logita[rows] = sum(c * _term(name, *args) for name, c in coefficients["logita"].items())
+        lam[rows] = coefficients["lambda"]
+    return logita, lam
+
+
+def volvff(dbh: np.ndarray, h: np.ndarray, logita: np.ndarray, lam: np.ndarray) -> np.ndarray:
+    """
+    lmfor::volvff, the stem volumes (dm^3) of trees with breast height diameters :dbh: (cm) and heights :h: (m).
+
+    The volume is the form factor plogis(logita) times the volume of a cylinder of height h, whose diameter is that of
+    the cone through the tree top and the breast height diameter at the ground, dbh * h / (h - 1.3). The ratio 1.3 /
+    (h - 1.3) is smoothed into 1.3 * tanh(exp(-lambda) * (h - 1.3) / 2) / (h - 1.3) so that the volume stays finite for
+    trees just over 1.3 meters. This reproduces the fitted fixed effects volumes stored in vol_mods_final_LM.rds.
+    """
+    dbh = np.asarray(dbh, dtype=float)
+    h = np.asarray(h, dtype=float)
+    x = h - 1.3
+    diameter = dbh * (1 + 1.3 * np.tanh(np.exp(-np.asarray(lam, dtype=float)) * x / 2) / x)
+    form_factor = 1 / (1 + np.exp(-np.asarray(logita, dtype=float)))
+    return form_factor * np.pi / 4 * (diameter / 100) ** 2 * h * 1000
+
+
+def compute_tree_volumes(
+        dbh: Sequence[float],
+        h: Sequence[float],
+        temp_sum: Sequence[float],
+        species: Sequence[str],
+        model_type: Sequence[str] = "scanned"
+        ) -> np.ndarray:
+    """ compute_tree_volumes of lmfor_volume.R: the volumes (dm^3) of trees predicted with the volume models """
+    logita, lam = volume_model_parameters(dbh, h, temp_sum, species, model_type)
+    return volvff(dbh, h, logita, lam)
+
+
+def _stand_trees(stands: Sequence[ForestStand]) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+    trees = [tree for stand in stands for tree in stand.reference_trees]
+    counts = [len(stand.reference_trees) for stand in stands]
+    return (
+        np.array([tree.breast_height_diameter for tree in trees], dtype=float),
+        np.array([tree.height for tree in trees], dtype=float),
+        np.repeat(np.array([stand.degree_days for stand in stands], dtype=float), counts),
+        [lmfor_species_map.get(tree.species, 'birch') for tree in trees])
+
+
+def lmfor_volume(stand: ForestStand) -> float:
+    """ Total volume of the reference trees of a stand with the scanned volume models, see r_utils.lmfor_volume """
+    volumes = compute_tree_volumes(*_stand_trees([stand]))
+    return sum(volumes.tolist())
+
+
+def lmfor_volume_many(stands: Sequence[ForestStand]) -> tuple[np.ndarray, list[np.ndarray]]:
+    """
+    lmfor_volume of many stands.
+
+    :return: the total volume of each stand, and the volumes of the reference trees of each stand
+    """
+    counts = [len(stand.reference_trees) for stand in stands]
+    if not any(counts):
+        return np.zeros(len(stands)), [np.zeros(0) for _ in stands]
+    volumes = compute_tree_volumes(*_stand_trees(stands))
+    # bincount sums the volumes of each stand in tree order, as lmfor_volume does
+    totals = np.bincount(np.repeat(np.arange(len(stands)), counts), volumes, minlength=len(stands))
+    return totals, np.split(volumes, np.cumsum(counts)[:-1])
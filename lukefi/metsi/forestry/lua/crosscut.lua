@@ -305,7 +305,27 @@ local function aptfunc_lupa(pcls, ptop, plen, pval, m, div, nas)
 	end
 end
 
+-- batch variant of aptfunc_lupa: cross-cuts trees 1..k of the spe, d, h arrays and returns the
+-- volumes and values of all trees as one flat sequence of results, where tree i has its volumes at
+-- (i-1)*2*nas+1 .. (i-1)*2*nas+nas followed by its values. the results are returned unpacked, so that
+-- the whole batch crosses the Lua-Python boundary as a single tuple.
+local function aptfunc_lupa_many(pcls, ptop, plen, pval, m, div, nas)
+	return function(k, spe, d, h)
+		local out = {}
+		for i=1, k do
+			local tvol, tval = apt(spe[i], d[i], h[i], pcls, ptop, plen, pval, m, div, nas)
+			local o = (i-1)*2*nas
+			for a=1, nas do
+				out[o+a] = tvol[a]
+				out[o+nas+a] = tval[a]
+			end
+		end
+		return table.unpack(out, 1, 2*k*nas)
+	end
+end
+
 return {
 	aptfunc_fhk = aptfunc_fhk,
-    aptfunc_lupa = aptfunc_lupa
+    aptfunc_lupa = aptfunc_lupa,
+    aptfunc_lupa_many = aptfunc_lupa_many
 }
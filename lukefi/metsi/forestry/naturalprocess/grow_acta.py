@@ -1,6 +1,8 @@
 from collections import defaultdict
 import math
 from statistics import median
+from typing import Sequence
+import numpy as np
 from lukefi.metsi.data.model import ReferenceTree, TreeSpecies
 
 def yearly_diameter_growth_by_species(
@@ -59,6 +61,79 @@ def yearly_height_growth_by_species(
     return growth_percent
 
 
+def _positive_log_arguments(*args: np.ndarray) -> None:
+    """ Raises ValueError as math.log does if any of the arguments is not positive. """
+    for x in args:
+        if np.any(x <= 0):
+            raise ValueError("math domain error")
+
+
+def yearly_diameter_growth_by_species_array(
+    spe: np.ndarray,
+    d: np.ndarray,
+    h: np.ndarray,
+    biological_age_aggregate: np.ndarray,
+    d13_aggregate: np.ndarray,
+    height_aggregate: np.ndarray,
+    dominant_height: np.ndarray,
+    basal_area_total: np.ndarray
+) -> np.ndarray:
+    """ Vectorised yearly_diameter_growth_by_species for arrays of trees and the aggregates of their species. Raises
+    ValueError where yearly_diameter_growth_by_species would take the logarithm of a non-positive value. """
+    spe, d, h, aa, da, ha, hdom, G = np.broadcast_arrays(
+        spe, d, h, biological_age_aggregate, d13_aggregate, height_aggregate, dominant_height, basal_area_total)
+    pine = spe == TreeSpecies.PINE
+    other = ~pine
+    _positive_log_arguments(aa, G, da, d, h, hdom[pine], ha[other])
+    growth_percent = np.empty(d.shape)
+    growth_percent[pine] = np.exp(5.4625
+        - 0.6675 * np.log(aa[pine])
+        - 0.4758 * np.log(G[pine])
+        + 0.1173 * np.log(da[pine])
+        - 0.9442 * np.log(hdom[pine])
+        - 0.3631 * np.log(d[pine])
+        + 0.7762 * np.log(h[pine]))
+    growth_percent[other] = np.exp(6.9342
+        - 0.8808 * np.log(aa[other])
+        - 0.4982 * np.log(G[other])
+        + 0.4159 * np.log(da[other])
+        - 0.3865 * np.log(ha[other])
+        - 0.6267 * np.log(d[other])
+        + 0.1287 * np.log(h[other]))
+    return growth_percent
+
+
+def yearly_height_growth_by_species_array(
+    spe: np.ndarray,
+    d: np.ndarray,
+    h: np.ndarray,
+    biological_age_aggregate: np.ndarray,
+    d13_aggregate: np.ndarray,
+    height_aggregate: np.ndarray,
+    basal_area_total: np.ndarray
+) -> np.ndarray:
+    """ Vectorised yearly_height_growth_by_species for arrays of trees and the aggregates of their species. Raises
+    ValueError where yearly_height_growth_by_species would take the logarithm of a non-positive value. """
+    spe, d, h, aa, da, ha, G = np.broadcast_arrays(
+        spe, d, h, biological_age_aggregate, d13_aggregate, height_aggregate, basal_area_total)
+    pine = spe == TreeSpecies.PINE
+    other = ~pine
+    _positive_log_arguments(aa, da, h, G[other], ha[other], d[other])
+    growth_percent = np.empty(d.shape)
+    growth_percent[pine] = np.exp(5.4636
+        - 0.9002 * np.log(aa[pine])
+        + 0.5475 * np.log(da[pine])
+        - 1.1339 * np.log(h[pine]))
+    growth_percent[other] = (12.7402
+        - 1.1786 * np.log(aa[other])
+        - 0.0937 * np.log(G[other])
+        - 0.1434 * np.log(da[other])
+        - 0.8070 * np.log(ha[other])
+        + 0.7563 * np.log(d[other])
+        - 2.0522 * np.log(h[other]))
+    return growth_percent
+
+
 def grow_diameter_and_height(
     trees: list[ReferenceTree],
     step: int = 5
@@ -94,3 +169,92 @@ def grow_diameter_and_height(
                 if hs[i] >= 1.3 and not ds[i]:
                     ds[i] = 1.0
     return ds, hs
+
+
+def grow_diameter_and_height_array(
+    d: Sequence[float],
+    h: Sequence[float],
+    biological_age: Sequence[float],
+    stems_per_ha: Sequence[float],
+    species: Sequence[TreeSpecies],
+    step: int = 5
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorised grow_diameter_and_height for a stand given as equal length arrays of tree diameters (cm, 0 or NaN if
+    missing), heights (m), biological ages, stems per hectare and species codes. Returns the grown diameters and heights.
+    """
+    return grow_diameter_and_height_many(d, h, biological_age, stems_per_ha, species, [0, len(h)], step)
+
+
+def grow_diameter_and_height_many(
+    d: Sequence[float],
+    h: Sequence[float],
+    biological_age: Sequence[float],
+    stems_per_ha: Sequence[float],
+    species: Sequence[TreeSpecies],
+    offsets: Sequence[int],
+    step: int = 5
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Grows a batch of stands at once. The trees of all stands are given as concatenated arrays as in
+    grow_diameter_and_height_array, and the trees of stand i are those in [offsets[i], offsets[i+1]). Returns the
+    grown diameters and heights in the same concatenated layout, equal to growing each stand separately.
+    The species must be given as non-negative integer codes (such as TreeSpecies values), which are used to key the
+    species groups of the stands.
+    """
+    ds = np.nan_to_num(np.array(d, dtype=float))
+    hs = np.array(h, dtype=float)
+    age = np.asarray(biological_age, dtype=float)
+    f = np.asarray(stems_per_ha, dtype=float)
+    species = np.asarray(species)
+    offsets = np.asarray(offsets, dtype=int)
+    if offsets[0] != 0 or offsets[-1] != len(hs) or np.any(np.diff(offsets) < 0):
+        raise ValueError("offsets must be an increasing sequence from 0 to the number of trees")
+    if ds.size == 0:
+        return ds, hs
+    if not np.issubdtype(species.dtype, np.integer):
+        if not np.issubdtype(species.dtype, np.number) or np.any(species != np.floor(species)):
+            raise ValueError("species must be non-negative integer species codes")
+        species = species.astype(int)
+    if species.min() < 0:
+        raise ValueError("species must be non-negative integer species codes")
+    stand = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    # species groups of the stands
+    _, group = np.unique(stand * (int(species.max()) + 1) + species, return_inverse=True)
+    group_stand = np.zeros(group.max() + 1, dtype=int)
+    group_stand[group] = stand
+    for s in range(step):
+        grown = hs >= 1.3
+        if np.any(grown):
+            grown_stands = np.bincount(stand[grown], minlength=len(offsets) - 1) > 0
+            hdom = _segmented_median(stand[grown], hs[grown])[stand[grown]]
+            gs = f*math.pi*(0.01*0.5*ds)**2
+            # bincount adds up in index order, as the scalar implementation does
+            G = np.bincount(stand, gs)[stand[grown]]
+            gg = np.bincount(group, gs)
+            # as in the scalar implementation, every species group of a stand with grown trees is aggregated
+            if np.any((gg == 0) & grown_stands[group_stand]):
+                raise ZeroDivisionError("float division by zero")
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ag = (np.bincount(group, (age+s)*gs) / gg)[group[grown]]
+                dg = (np.bincount(group, ds*gs) / gg)[group[grown]]
+                hg = (np.bincount(group, hs*gs) / gg)[group[grown]]
+            spe, dd, hh = species[grown], ds[grown], hs[grown]
+            pd = yearly_diameter_growth_by_species_array(spe, dd, hh, ag, dg, hg, hdom, G)/100
+            ph = yearly_height_growth_by_species_array(spe, dd, hh, ag, dg, hg, G)/100
+            ds[grown] = dd*(1+pd)
+            hs[grown] = hh*(1+ph)
+        small = hs < 1.3
+        hs[small] += 0.3
+        ds[small & (hs >= 1.3) & (ds == 0)] = 1.0
+    return ds, hs
+
+
+def _segmented_median(segment: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """ Medians of the values :x: by non-negative :segment: index. Segments without values get NaN. """
+    x = x[np.lexsort((x, segment))]
+    counts = np.bincount(segment)
+    start = np.cumsum(counts) - counts
+    lo = np.minimum(start + (counts - 1) // 2, len(x) - 1)
+    hi = np.minimum(start + counts // 2, len(x) - 1)
+    return np.where(counts > 0, (x[lo] + x[hi]) / 2, np.nan)
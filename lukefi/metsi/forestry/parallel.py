@@ -0,0 +1,91 @@
+""" Process pool driver for simulating stands in parallel """
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from multiprocessing.context import BaseContext
+from typing import Callable, Iterable, Iterator, Optional, Sequence, TypeVar
+import numpy as np
+from lukefi.metsi.forestry.warmup import FORK_SAFE_BACKENDS, warmup
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def _init_worker(price_tables: Sequence[np.ndarray], backends: Sequence[str], div: int) -> None:
+    warmup(price_tables, backends, div)
+
+
+def _run_chunk(fn: Callable[[T], R], chunk: list[T]) -> list[R]:
+    return [fn(stand) for stand in chunk]
+
+
+def map_stands(
+        fn: Callable[[T], R],
+        stands: Iterable[T],
+        processes: Optional[int] = None,
+        price_tables: Sequence[np.ndarray] = (),
+        backends: Sequence[str] = (),
+        div: int = 10,
+        chunksize: int = 1,
+        max_pending: Optional[int] = None,
+        mp_context: Optional[BaseContext] = None
+        ) -> Iterator[R]:
+    """
+    Applies :fn: to each stand in a pool of worker processes and yields the results in the order of :stands:.
+
+    :fn: must be picklable, i.e. a module level function, and it runs the whole per-stand pipeline (e.g. growth,
+    thinning and cross-cutting). Each worker initialises the :backends: (see warmup.warmup) for :price_tables: once when
+    it starts. If the workers are forked, the fork safe backends are initialised in the calling process before the
+    workers are started, and the workers inherit them. The stands are consumed lazily and sent to the workers in chunks
+    of :chunksize:, with at most :max_pending: chunks (2 per worker by default) submitted or holding results not yet
+    yielded, so that the memory use is bounded also for very large inputs. By default there is a worker per CPU, and
+    with :processes: 1 the stands are processed in the calling process.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be a positive integer")
+    if processes is not None and processes < 1:
+        raise ValueError("processes must be a positive integer")
+    return _map_stands(fn, stands, processes, price_tables, backends, div, chunksize, max_pending, mp_context)
+
+
+def _map_stands(
+        fn: Callable[[T], R],
+        stands: Iterable[T],
+        processes: Optional[int],
+        price_tables: Sequence[np.ndarray],
+        backends: Sequence[str],
+        div: int,
+        chunksize: int,
+        max_pending: Optional[int],
+        mp_context: Optional[BaseContext]
+        ) -> Iterator[R]:
+    if processes == 1:
+        warmup(price_tables, backends, div)
+        yield from map(fn, stands)
+        return
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or 2 * processes
+    mp_context = mp_context or multiprocessing.get_context()
+    if mp_context.get_start_method() == "fork":
+        warmup(price_tables, [b for b in backends if b in FORK_SAFE_BACKENDS], div)
+    executor = ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(tuple(price_tables), tuple(backends), div))
+    pending: deque[Future] = deque()
+    try:
+        it = iter(stands)
+        while True:
+            while len(pending) < max_pending:
+                chunk = list(islice(it, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_run_chunk, fn, chunk))
+            if not pending:
+                break
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -15,6 +15,21 @@ class SupplementStrategy:
         self.tree_identifier: str = None
 
 
+class SupplementIndex:
+    """ Age trees and age stratums of a stand indexed by species, and age trees by identifier, so that the strategy
+    of each tree is solved without scanning all age trees and stratums.
+    """
+    def __init__(self, age_trees: typing.List[ReferenceTree], age_stratums: typing.List[TreeStratum]):
+        self.stratums_by_species: typing.Dict[typing.Any, typing.List[TreeStratum]] = {}
+        self.trees_by_species: typing.Dict[typing.Any, typing.List[ReferenceTree]] = {}
+        self.trees_by_identifier: typing.Dict[str, ReferenceTree] = {}
+        for stratum in age_stratums:
+            self.stratums_by_species.setdefault(stratum.species, []).append(stratum)
+        for tree in age_trees:
+            self.trees_by_species.setdefault(tree.species, []).append(tree)
+            self.trees_by_identifier.setdefault(tree.identifier, tree)
+
+
 def generate_diameter_threshold(d1: float, d2: float) -> float:
     """ Threshold value for diameter based comparison of two stratums.
     The threshold is generated based on d[0].
@@ -72,14 +87,16 @@ def solve_stratum_supplement(reference_tree: ReferenceTree, age_stratums: typing
 
 def perform_supplementing(tree_and_strategy: typing.List[typing.Tuple[ReferenceTree, SupplementStrategy]],
                           age_trees: typing.List[ReferenceTree],
-                          age_stratums: typing.List[TreeStratum]) -> typing.List[ReferenceTree]:
+                          age_stratums: typing.List[TreeStratum],
+                          index: typing.Optional[SupplementIndex] = None) -> typing.List[ReferenceTree]:
+    index = index or SupplementIndex(age_trees, age_stratums)
     for (rt, s) in tree_and_strategy:
         if s.strategy is STRATUM_SUPPLEMENT:
-            stratum = solve_stratum_supplement(rt, age_stratums)
+            stratum = solve_stratum_supplement(rt, index.stratums_by_species.get(rt.species, []))
             rt.breast_height_age = stratum.breast_height_age
             rt.biological_age = stratum.biological_age
         elif s.strategy is INITIAL_TREE_SUPPLEMENT:
-            supplement_tree = next((tree for tree in age_trees if tree.identifier == s.tree_identifier))
+            supplement_tree = index.trees_by_identifier[s.tree_identifier]
             rt.breast_height_age = supplement_tree.breast_height_age
             rt.biological_age = supplement_tree.biological_age
         elif s.strategy is SAME_TREE_DIAMETER_SUPPLEMENT:
@@ -145,14 +162,17 @@ def stratum_strategy(reference_tree: ReferenceTree, stratums: typing.List[TreeSt
 
 def solve_supplement_strategy(no_age_trees: typing.List[ReferenceTree],
                               age_trees: typing.List[ReferenceTree],
-                              age_stratums: typing.List[TreeStratum]) -> typing.List[SupplementStrategy]:
+                              age_stratums: typing.List[TreeStratum],
+                              index: typing.Optional[SupplementIndex] = None) -> typing.List[SupplementStrategy]:
     """ Solveing a supplement strategy happens in a priority order in which stratum strategy
-    is with highest priority and using same same tree to supplement the lowest."""
+    is with highest priority and using same same tree to supplement the lowest.
+    The candidate stratums and trees of each tree are looked up from the index of the stand."""
+    index = index or SupplementIndex(age_trees, age_stratums)
     supplement_strategies = []
     for rt in no_age_trees:
-        strategy = stratum_strategy(rt, age_stratums)
+        strategy = stratum_strategy(rt, index.stratums_by_species.get(rt.species, []))
         if not strategy.solved:
-            strategy = tree_strategy(rt, age_trees)
+            strategy = tree_strategy(rt, index.trees_by_species.get(rt.species, []))
         if not strategy.solved:
             strategy = final_tree_strategy(rt)
         if strategy.solved:
@@ -171,6 +191,7 @@ def supplement_age_for_reference_trees(reference_trees: typing.List[ReferenceTre
     no_age_trees = list(filter(lambda t: t.breast_height_age == 0.0 and t.has_height_over_130_cm(), reference_trees))
     age_trees = list(filter(lambda t: t.breast_height_age > 0.0, reference_trees))
     age_stratums = list(filter(lambda s: s.breast_height_age > 0.0, stratums))
-    trees_and_strategies = solve_supplement_strategy(no_age_trees, age_trees, age_stratums)
-    return perform_supplementing(trees_and_strategies, age_trees, age_stratums)
+    index = SupplementIndex(age_trees, age_stratums)
+    trees_and_strategies = solve_supplement_strategy(no_age_trees, age_trees, age_stratums, index)
+    return perform_supplementing(trees_and_strategies, age_trees, age_stratums, index)
     # TODO: Remove zero stem stratums. See vmi-data-converter issue #55.
@@ -5,7 +5,8 @@
       sapling trees
 """
 import math
-from typing import Optional, List, Tuple
+from typing import Optional, List, Sequence, Tuple, Union
+import numpy as np
 from lukefi.metsi.data.model import ReferenceTree, TreeStratum
 from lukefi.metsi.forestry.preprocessing import pre_util
 
@@ -78,6 +79,78 @@ def weibull(n_samples: int, diameter: float, basal_area: float, height: float, m
     return result
 
 
+def weibull_many(
+        n_samples: Union[int, Sequence[int]],
+        diameter: Sequence[float],
+        basal_area: Sequence[float],
+        height: Sequence[float],
+        min_diameter: Optional[Sequence[float]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Computes the stems per hectare and diameters of weibull for a batch of strata at once.
+
+    The strata are given as equal length arrays of mean diameters (cm), basal areas and mean heights (m), and optionally
+    minimum diameters (NaN if not given). :n_samples: is the number of trees of each stratum, or the same for all.
+    The samples of all strata are computed as arrays padded to the largest number of samples, with the class borders
+    accumulated in the order of weibull. The results equal those of weibull up to the rounding of the exponential
+    function. Where weibull divides by zero the values are inf or NaN.
+
+    :return stems per hectare and diameters (cm) of the trees of all strata concatenated, and the offsets of the strata
+        such that the trees of stratum i are those in [offsets[i], offsets[i+1])
+    """
+    diameter = np.asarray(diameter, dtype=float)
+    basal_area = np.asarray(basal_area, dtype=float)
+    height = np.asarray(height, dtype=float)
+    n_samples = np.broadcast_to(np.asarray(n_samples, dtype=int), diameter.shape)
+    offsets = np.concatenate(([0], np.cumsum(n_samples)))
+    if diameter.size == 0 or offsets[-1] == 0:
+        return np.zeros(0), np.zeros(0), offsets
+    if min_diameter is None:
+        min_diameter = np.full(diameter.shape, np.nan)
+    # the coefficients and the x-axis upperlimits of the strata, with the floating point results of weibull
+    coeffs = [weibull_coeffs(d, g, None if math.isnan(m) else m) for d, g, m in zip(diameter, basal_area, min_diameter)]
+    a, b, c = (np.array(w, dtype=float) for w in zip(*coeffs))
+    ax = np.array([a_ + b_ * math.pow(4.60517, (1.0 / c_)) for a_, b_, c_ in coeffs])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        interval = (ax - a) / n_samples
+        interval = np.where(interval < 0.0, 1.0, interval)
+
+        # class upper borders by repeated addition of the interval, as in weibull
+        steps = np.empty((len(a), int(n_samples.max()) + 1))
+        steps[:, 0] = a
+        steps[:, 1:] = interval[:, None]
+        xx = np.cumsum(steps, axis=1)[:, 1:]
+        computed_diameter = xx - (interval / 2.0)[:, None]
+        computed_diameter[height < 1.3] = 0.0
+
+        f = 1 - np.exp(-np.power(((xx - a[:, None]) / b[:, None]), c[:, None]))
+        f[xx >= ax[:, None]] = 1.0
+        p = np.diff(f, axis=1, prepend=0.0)
+
+        stems = (12732.4 * basal_area)[:, None] / np.power(computed_diameter, 2.0)
+        stems_per_sample = p * stems
+
+    valid = np.arange(xx.shape[1]) < n_samples[:, None]
+    return stems_per_sample[valid], computed_diameter[valid], offsets
+
+
+def weibull_array(n_samples: int, diameter: float, basal_area: float, height: float, min_diameter: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """ weibull returning the stems per hectare and diameters (cm) of the trees as arrays. See weibull_many. """
+    stems, diameters, _ = weibull_many(
+        n_samples, [diameter], [basal_area], [height], None if min_diameter is None else [min_diameter])
+    return stems, diameters
+
+
+def reference_trees_from_arrays(stems_per_ha: Sequence[float], breast_height_diameter: Sequence[float]) -> List[ReferenceTree]:
+    """ Reference trees with the given stems per hectare and diameters, e.g. from weibull_array """
+    result = []
+    for f, d in zip(stems_per_ha, breast_height_diameter):
+        reference_tree = ReferenceTree()
+        reference_tree.stems_per_ha = float(f)
+        reference_tree.breast_height_diameter = float(d)
+        result.append(reference_tree)
+    return result
+
+
 # ---- Simple height distribution model ----
 
 # NOTE: Debricated, only for test purposes
@@ -134,6 +207,26 @@ def diameter_model_siipilehto(height_rt: float, height: float, diameter: float,
     return math.exp(lndiJS + dvari / 2.0)
 
 
+def diameter_model_valkonen_array(height_rt: np.ndarray) -> np.ndarray:
+    """ Vectorised diameter_model_valkonen """
+    lndi = 1.5663 + 0.4559 * np.log(height_rt) + 0.0324 * height_rt
+    return np.exp(lndi + 0.004713 / 2) - 5.0
+
+
+def diameter_model_siipilehto_array(height_rt: np.ndarray, height: np.ndarray, diameter: np.ndarray, dominant_height: np.ndarray) -> np.ndarray:
+    """ Vectorised diameter_model_siipilehto """
+    lndiJS = (
+        0.3904
+        + 0.9119 * np.log(height_rt - 1.0)
+        + 0.05318 * height_rt \
+        - 1.0845 * np.log(height)
+        + 0.9468 * np.log(diameter + 1)
+        - 0.0311 * dominant_height
+    )
+    dvari = 0.000478 + 0.000305 + 0.03199 # for bias correction
+    return np.exp(lndiJS + dvari / 2.0)
+
+
 def predict_sapling_diameters(reference_trees: List[ReferenceTree], height: float, diameter: float, dominant_height: float) -> List[ReferenceTree]:
     """ Logic for predicting sapling diameters.
 
@@ -258,3 +351,96 @@ def sapling_height_distribution(stratum: TreeStratum, dominant_height: float, n_
             stratum.mean_diameter,
             dominant_height
         )
+
+
+def predict_sapling_diameters_array(heights: np.ndarray, height: np.ndarray, diameter: np.ndarray, dominant_height: np.ndarray) -> np.ndarray:
+    """ Vectorised predict_sapling_diameters for an array of reference tree heights (m) and the mean height (m), mean
+    diameter (cm) and dominant height (m) of the stratum of each tree.
+
+    return: reference tree diameters (cm)
+    """
+    heights = np.asarray(heights, dtype=float)
+    height = np.asarray(height, dtype=float)
+    diameter = np.asarray(diameter, dtype=float)
+    siipilehto = (heights > 1.3) & (height > 1.3) & (diameter > 0.0)
+    valkonen = ~siipilehto & (heights >= 1.3) & ((height >= 1.3) | (diameter <= 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        di = np.where(
+            siipilehto,
+            diameter_model_siipilehto_array(heights, height, diameter, dominant_height),
+            diameter_model_valkonen_array(heights))
+    return np.where(siipilehto | valkonen, di, 0.0)
+
+
+def weibull_sapling_many(
+        height: Sequence[float],
+        stem_count: Sequence[float],
+        dominant_height: Sequence[float],
+        n_trees: Union[int, Sequence[int]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ weibull_sapling for a batch of sapling strata given as arrays of mean heights (m), stem counts and dominant
+    heights. :n_trees: is the number of reference trees of each stratum, or the same for all. The heights are rounded
+    as in weibull_sapling.
+
+    return: heights (m) and stems per hectare of the trees of all strata concatenated, and the offsets of the strata
+        such that the trees of stratum i are those in [offsets[i], offsets[i+1])
+    """
+    height = np.asarray(height, dtype=float)
+    stem_count = np.asarray(stem_count, dtype=float)
+    dominant_height = np.asarray(dominant_height, dtype=float)
+    n_trees = np.broadcast_to(np.asarray(n_trees, dtype=int), height.shape)
+    offsets = np.concatenate(([0], np.cumsum(n_trees)))
+    # Mean diameter and dominant height can be illogical:
+    dominant_height = np.where(dominant_height <= height, 1.05 * height, dominant_height)
+    # Weibull parameters of weibull_sapling
+    b = np.exp(0.1942
+        + 0.9971 * np.log(height)
+        + -0.0580 / np.log(dominant_height/height + 0.4)
+    )
+    c = np.exp(
+        -2.4203
+        + 0.0895 * height
+        + -0.0637 * dominant_height
+        + 0.2510 * np.log(stem_count)
+        + 1.2707 / np.log(dominant_height / height +0.4)
+    )
+    # class centers of the trees in their strata
+    stratum = np.repeat(np.arange(len(height)), n_trees)
+    i = np.arange(offsets[-1]) - offsets[:-1][stratum]
+    classN = 1 / n_trees[stratum].astype(float)
+    Ph = (i + 1) * classN - classN / 2
+    hi = b[stratum] * (-np.log(1.0 - Ph))**(1.0 / c[stratum])
+    return pre_util.round_array(hi, 2), (stem_count / n_trees)[stratum], offsets
+
+
+def sapling_height_distribution_many(
+        mean_height: Sequence[float],
+        stems_per_ha: Sequence[float],
+        mean_diameter: Sequence[float],
+        dominant_height: Sequence[float],
+        n_trees: Union[int, Sequence[int]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ sapling_height_distribution for a batch of strata given as arrays of the stratum mean heights (m), stems per
+    hectare, mean diameters (cm) and dominant heights (m). :n_trees: is the number of reference trees of each stratum,
+    or the same for all. Strata of a single tree get the stratum values as in sapling_height_distribution.
+
+    return: heights (m), diameters (cm) and stems per hectare of the trees of all strata concatenated, and the offsets
+        of the strata such that the trees of stratum i are those in [offsets[i], offsets[i+1])
+    """
+    mean_height = np.asarray(mean_height, dtype=float)
+    stems_per_ha = np.asarray(stems_per_ha, dtype=float)
+    mean_diameter = np.asarray(mean_diameter, dtype=float)
+    n_trees = np.broadcast_to(np.asarray(n_trees, dtype=int), mean_height.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        heights, stems, offsets = weibull_sapling_many(mean_height, stems_per_ha, dominant_height, n_trees)
+    stratum = np.repeat(np.arange(len(mean_height)), n_trees)
+    diameters = predict_sapling_diameters_array(
+        heights,
+        mean_height[stratum],
+        mean_diameter[stratum],
+        1.05 * mean_height[stratum])
+    single = n_trees[stratum] == 1
+    heights[single] = mean_height[stratum][single]
+    diameters[single] = mean_diameter[stratum][single]
+    stems[single] = stems_per_ha[stratum][single]
+    return heights, diameters, stems, offsets
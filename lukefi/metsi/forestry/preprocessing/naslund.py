@@ -1,7 +1,9 @@
 """ Module contains forestry domain spesific model functions """
 import math
-from typing import Optional
+from typing import Optional, Sequence
+import numpy as np
 from lukefi.metsi.data.enums.internal import TreeSpecies
+from lukefi.metsi.forestry.preprocessing import pre_util
 
 
 NASLUND_PINE_OR_OTHER_CONIFEROUS = [
@@ -22,6 +24,12 @@ NASLUND_PINE_OR_OTHER_CONIFEROUS = [
     TreeSpecies.YEW,
     ]
 
+# Näslund model groups by species code: 0 for pine or other coniferous, 1 for spruce and 2 for other species
+NASLUND_GROUPS = np.full(max(TreeSpecies) + 1, 2, dtype=np.int8)
+NASLUND_GROUPS[NASLUND_PINE_OR_OTHER_CONIFEROUS] = 0
+NASLUND_GROUPS[TreeSpecies.SPRUCE] = 1
+
+
 def naslund_height(diameter: float, species: TreeSpecies) -> Optional[float]:
     """
     Näslund height model, with parameters from one Siipilehto. As extracted from LueVMI12.py.
@@ -45,3 +53,24 @@ def naslund_height(diameter: float, species: TreeSpecies) -> Optional[float]:
             return round(height, 2)
     else:
         return None
+
+
+def naslund_height_array(diameters: Sequence[float], species_codes: Sequence[int]) -> np.ndarray:
+    """
+    Vectorised naslund_height for arrays of tree diameters and species codes in internal TreeSpecies terms. Codes that
+    are not TreeSpecies values get the model of other species.
+    :return estimated heights of the trees in meters, NaN where naslund_height returns None
+    """
+    d = np.asarray(diameters, dtype=float)
+    codes = np.asarray(species_codes, dtype=int)
+    known = (codes >= 0) & (codes < len(NASLUND_GROUPS))
+    group = np.where(known, NASLUND_GROUPS[np.where(known, codes, 0)], 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        height = np.where(
+            group == 0,
+            ((d ** 2) / (0.894 + 0.185 * d) ** 2) + 1.3,
+            np.where(
+                group == 1,
+                ((d ** 3) / (1.811 + 0.308 * d) ** 3) + 1.3,
+                ((d ** 2) / (0.898 + 0.242 * d) ** 2) + 1.3))
+    return np.where(d > 0, pre_util.round_array(height, 2), np.nan)
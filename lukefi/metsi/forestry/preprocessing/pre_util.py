@@ -1,5 +1,6 @@
 """ Module contains basic, domain and state spesific utility functions used in preprocessing operations"""
 from typing import Optional, List, Tuple, Any
+import numpy as np
 from lukefi.metsi.data.model import ReferenceTree, TreeStratum, ForestStand
 
 
@@ -9,6 +10,19 @@ def get_or_default(maybe: Optional[Any], default: Any = None) -> Any:
     return default if maybe is None else maybe
 
 
+def round_array(values: np.ndarray, ndigits: int = 2) -> np.ndarray:
+    """ round(value, ndigits) of an array of values. Values within the floating point error of a tie are rounded with
+    round, as numpy rounds them differently.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, ndigits)
+    with np.errstate(invalid="ignore"):
+        ties = np.abs(np.abs(values * 10**ndigits) % 1 - 0.5) < 1e-6
+    for i in zip(*np.nonzero(ties)):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
 # ---- domain utils ----
 
 def scale_stems_per_ha(trees: List[ReferenceTree], area_factors: Tuple[float, float]) -> List[ReferenceTree]:
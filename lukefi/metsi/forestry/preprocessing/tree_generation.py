@@ -1,9 +1,11 @@
 """ Module contains tree generation logic that uses distribution based tree generation models (see. distributions module) """
-from typing import Optional, List
+from itertools import islice
+from typing import Iterable, Iterator, Optional, List, Tuple
+import numpy as np
 from lukefi.metsi.data.model import ReferenceTree, TreeStratum
 from enum import Enum
-from lukefi.metsi.forestry.preprocessing import distributions
-from lukefi.metsi.forestry.preprocessing.naslund import naslund_height
+from lukefi.metsi.forestry.preprocessing import distributions, pre_util
+from lukefi.metsi.forestry.preprocessing.naslund import naslund_height_array
 
 class TreeStrategy(Enum):
     WEIBULL_DISTRIBUTION = 'weibull_distribution'
@@ -11,23 +13,47 @@ class TreeStrategy(Enum):
     SKIP = 'skip_tree_generation'
 
 
+def _finalize_tree(
+        reference_tree: ReferenceTree,
+        stratum: TreeStratum,
+        tree_number: int,
+        breast_height_age: float,
+        diameter: float,
+        stems_per_ha: Optional[float],
+        breast_height_diameter: Optional[float],
+        height: Optional[float]) -> ReferenceTree:
+    """ Inflates the common variables from stratum to a tree. The rounded values are set as such, while the breast
+    height age of a tree without one is decided by its unrounded :diameter:.
+    """
+    reference_tree.stand = stratum.stand
+    reference_tree.species = stratum.species
+    reference_tree.breast_height_age = breast_height_age
+    reference_tree.biological_age = stratum.biological_age
+    if reference_tree.breast_height_age == 0.0 and diameter > 0.0:
+        reference_tree.breast_height_age = 1.0
+    reference_tree.tree_number = tree_number
+    reference_tree.stems_per_ha = stems_per_ha
+    reference_tree.breast_height_diameter = breast_height_diameter
+    reference_tree.height = height
+    return reference_tree
+
+
 def finalize_trees(reference_trees: List[ReferenceTree], stratum: TreeStratum) -> List[ReferenceTree]:
     """ For all given trees inflates the common variables from stratum. """
+    def rounded(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value, 2)
     n_trees = len(reference_trees)
+    breast_height_age = 0.0 if n_trees == 1 else stratum.get_breast_height_age()
     for i, reference_tree in enumerate(reference_trees):
-        reference_tree.stand = stratum.stand
-        reference_tree.species = stratum.species
-        reference_tree.breast_height_age = 0.0 if n_trees == 1 else stratum.get_breast_height_age()
-        reference_tree.biological_age = stratum.biological_age
-        if reference_tree.breast_height_age == 0.0 and reference_tree.breast_height_diameter > 0.0:
-            reference_tree.breast_height_age = 1.0
-        reference_tree.tree_number = i + 1
-        reference_tree.stems_per_ha = None if reference_tree.stems_per_ha is None \
-            else round(reference_tree.stems_per_ha, 2)
-        reference_tree.breast_height_diameter = None if reference_tree.breast_height_diameter is None \
-            else round(reference_tree.breast_height_diameter, 2)
-        reference_tree.height = None if reference_tree.height is None \
-            else round(reference_tree.height, 2)
+        _finalize_tree(
+            reference_tree,
+            stratum,
+            i + 1,
+            breast_height_age,
+            reference_tree.breast_height_diameter,
+            rounded(reference_tree.stems_per_ha),
+            rounded(reference_tree.breast_height_diameter),
+            rounded(reference_tree.height))
     return reference_trees
 
 
@@ -45,11 +71,11 @@ def trees_from_weibull(stratum: TreeStratum, n_trees: int) -> List[ReferenceTree
         stratum.basal_area,
         stratum.mean_height)
     # height
-    for reference_tree in result:
-        height = naslund_height(
-            reference_tree.breast_height_diameter,
-            stratum.species)
-        reference_tree.height = 0.0 if height is None else height
+    heights = naslund_height_array(
+        [reference_tree.breast_height_diameter for reference_tree in result],
+        np.full(len(result), 0 if stratum.species is None else stratum.species))
+    for reference_tree, height in zip(result, np.nan_to_num(heights, nan=0.0).tolist()):
+        reference_tree.height = height
     return result
 
 
@@ -106,3 +132,114 @@ def reference_trees_from_tree_stratum(stratum: TreeStratum, n_trees: Optional[in
         raise UserWarning("Unable to generate reference trees from stratum {}".format(stratum.identifier))
     return finalize_trees(result, stratum)
 
+
+def _weibull_batch(strata: List[TreeStratum], n_trees: int) -> Tuple[np.ndarray, ...]:
+    """ trees_from_weibull for a batch of strata, as arrays of stems per hectare, diameters and heights and offsets """
+    stems, diameters, offsets = distributions.weibull_many(
+        n_trees,
+        [s.mean_diameter for s in strata],
+        [s.basal_area for s in strata],
+        [s.mean_height for s in strata])
+    species = np.repeat([0 if s.species is None else s.species for s in strata], np.diff(offsets))
+    heights = np.nan_to_num(naslund_height_array(diameters, species), nan=0.0)
+    return stems, diameters, heights, offsets
+
+
+def _sapling_height_distribution_batch(strata: List[TreeStratum], n_trees: int) -> Tuple[np.ndarray, ...]:
+    """ trees_from_sapling_height_distribution for a batch of strata, as arrays of stems per hectare, diameters and
+    heights and offsets
+    """
+    heights, diameters, stems, offsets = distributions.sapling_height_distribution_many(
+        [s.mean_height for s in strata],
+        [s.stems_per_ha for s in strata],
+        [s.mean_diameter for s in strata],
+        0.0,
+        n_trees)
+    return stems, diameters, heights, offsets
+
+
+def _finalized_trees(
+        strata: List[TreeStratum],
+        n_trees: int,
+        stems: np.ndarray,
+        diameters: np.ndarray,
+        heights: np.ndarray,
+        offsets: np.ndarray,
+        sapling: bool
+) -> List[List[ReferenceTree]]:
+    """ Reference trees of the strata from the generated arrays, finalised as in finalize_trees """
+    rounded_stems = pre_util.round_array(stems).tolist()
+    rounded_diameters = pre_util.round_array(diameters).tolist()
+    rounded_heights = pre_util.round_array(heights).tolist()
+    diameters = diameters.tolist()
+    result = []
+    for k, stratum in enumerate(strata):
+        trees = []
+        breast_height_age = 0.0 if n_trees == 1 else stratum.get_breast_height_age()
+        for number, i in enumerate(range(offsets[k], offsets[k+1]), 1):
+            reference_tree = _finalize_tree(
+                ReferenceTree(),
+                stratum,
+                number,
+                breast_height_age,
+                diameters[i],
+                rounded_stems[i],
+                rounded_diameters[i],
+                rounded_heights[i])
+            if sapling:
+                reference_tree.sapling = True
+            trees.append(reference_tree)
+        result.append(trees)
+    return result
+
+
+def reference_trees_from_tree_strata(
+        strata: Iterable[TreeStratum],
+        n_trees: int = 10,
+        chunksize: int = 1000
+) -> Iterator[List[ReferenceTree]]:
+    """ reference_trees_from_tree_stratum for a stream of strata.
+
+    The strata are consumed lazily in chunks of :chunksize:, so that only the trees of one chunk are held in memory at
+    a time. The strata of a chunk are grouped by their TreeStrategy, and the trees of each group are generated and
+    finalised on arrays with the batched distribution models. Strata lacking a value needed by the batched models are
+    generated with reference_trees_from_tree_stratum. The batched models agree with the per stratum models up to
+    floating point rounding, which may show in the last rounded decimal of a generated value.
+
+    For stands, pass e.g. (stratum for stand in stands for stratum in stand.tree_strata).
+
+    :param strata: Iterable of strata.
+    :param (optional) n_trees: Number of reference trees to be generated per stratum (10 by default).
+    :param (optional) chunksize: Number of strata processed at a time.
+    :return: Iterator of lists of finalised reference trees, one list per chunk of strata, in the order of the strata.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be a positive integer")
+    batches = {
+        TreeStrategy.WEIBULL_DISTRIBUTION: (_weibull_batch, ("mean_diameter", "basal_area", "mean_height")),
+        TreeStrategy.HEIGHT_DISTRIBUTION:
+            (_sapling_height_distribution_batch, ("mean_diameter", "stems_per_ha", "mean_height")),
+    }
+    it = iter(strata)
+    while True:
+        chunk = list(islice(it, chunksize))
+        if not chunk:
+            return
+        trees: List[List[ReferenceTree]] = [[] for _ in chunk]
+        groups = {strategy: [] for strategy in batches}
+        for i, stratum in enumerate(chunk):
+            strategy = solve_tree_generation_strategy(stratum)
+            if strategy == TreeStrategy.SKIP:
+                continue
+            if strategy in batches and all(getattr(stratum, a) is not None for a in batches[strategy][1]):
+                groups[strategy].append(i)
+            else:
+                trees[i] = reference_trees_from_tree_stratum(stratum, n_trees)
+        for strategy, idx in groups.items():
+            if idx:
+                group = [chunk[i] for i in idx]
+                arrays = batches[strategy][0](group, n_trees)
+                sapling = strategy == TreeStrategy.HEIGHT_DISTRIBUTION and n_trees > 1
+                for i, result in zip(idx, _finalized_trees(group, n_trees, *arrays, sapling)):
+                    trees[i] = result
+        yield [rt for result in trees for rt in result]
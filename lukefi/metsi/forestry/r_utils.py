@@ -1,56 +1,43 @@
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Sequence
 
-from lukefi.metsi.data.enums.internal import TreeSpecies
+import numpy as np
 from lukefi.metsi.data.model import ForestStand
+from lukefi.metsi.forestry import lmfor_models
+from lukefi.metsi.forestry.lmfor_models import lmfor_species_map
 
 import rpy2.robjects as robjects
+from rpy2.robjects import numpy2ri
+from rpy2.robjects.conversion import localconverter
 
 initialised = False
 
-
-def _set_working_dir_here() -> None:
-    """Sets the working directory to forestryfunctions. Currently relies on the current file being directly under forestryfunctions."""
-    dirname = os.path.dirname(os.path.realpath(__file__))
-    os.chdir(dirname)
+R_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'r')
 
 
 def get_r_with_sourced_scripts() -> robjects.R:
-    """Returns the R instance that has sourced all required R-scripts. During sourcing, the working directory is set to .../forestryfunctions, after which it's set back to the initial directory."""
+    """Returns the R instance that has sourced all required R-scripts. The scripts are sourced by their absolute paths,
+    and lmfor_volume.R reads the volume models from volmods_path, so the working directory is never changed."""
     global initialised
     r = robjects.r
 
     if not initialised:
-        original_wd = os.getcwd()
-        
-        #change wd temporarily
-        _set_working_dir_here()
-        r.source('./r/lmfor_volume.R')
+        robjects.globalenv['volmods_path'] = os.path.join(R_DIR, 'vol_mods_final_LM.rds')
+        r.source(os.path.join(R_DIR, 'lmfor_volume.R'))
         initialised = True
 
-        #set wd back to the initial
-        os.chdir(original_wd)
-
     return r
 
 
-lmfor_species_map = {
-    TreeSpecies.PINE: 'pine',
-    TreeSpecies.SHORE_PINE: 'pine',
-    TreeSpecies.OTHER_PINE: 'pine',
-    TreeSpecies.SPRUCE: 'spruce',
-    TreeSpecies.BLACK_SPRUCE: 'spruce',
-    TreeSpecies.OTHER_SPRUCE: 'spruce',
-    TreeSpecies.OTHER_CONIFEROUS: 'spruce',
-    TreeSpecies.CURLY_BIRCH: 'birch',
-    TreeSpecies.DOWNY_BIRCH: 'birch',
-    TreeSpecies.SILVER_BIRCH: 'birch',
-    TreeSpecies.OTHER_DECIDUOUS: 'birch'
-}
-
-
-def lmfor_volume(stand: ForestStand) -> float:
-    
+def lmfor_volume(stand: ForestStand, implementation: str = "py") -> float:
+    """
+    Total volume of the reference trees of a stand with the scanned lmfor volume models. The "py" implementation
+    evaluates the models with NumPy in lmfor_models, and "r" calls compute_tree_volumes of lmfor_volume.R.
+    """
+    if implementation == "py":
+        return lmfor_models.lmfor_volume(stand)
+    if implementation != "r":
+        raise ValueError(f"unknown lmfor volume implementation {implementation}")
     r = get_r_with_sourced_scripts()
 
     source_data = {
@@ -65,5 +52,41 @@ def lmfor_volume(stand: ForestStand) -> float:
     total_volume = sum(volumes)
     return total_volume
 
+def lmfor_volume_many(
+        stands: Sequence[ForestStand],
+        implementation: str = "py") -> tuple[np.ndarray, list[np.ndarray]]:
+    """
+    Computes the lmfor volumes of the reference trees of many stands. With "r" this is a single call to R: the trees of
+    all stands are concatenated into one DataFrame, whose numeric columns are converted from NumPy arrays with numpy2ri.
+
+    :return: the total volume of each stand, and the volumes of the reference trees of each stand
+    """
+    if implementation == "py":
+        return lmfor_models.lmfor_volume_many(stands)
+    if implementation != "r":
+        raise ValueError(f"unknown lmfor volume implementation {implementation}")
+    r = get_r_with_sourced_scripts()
+    trees = [tree for stand in stands for tree in stand.reference_trees]
+    counts = [len(stand.reference_trees) for stand in stands]
+    stand_index = np.repeat(np.arange(len(stands)), counts)
+    if not trees:
+        return np.zeros(len(stands)), [np.zeros(0) for _ in stands]
+
+    with localconverter(robjects.default_converter + numpy2ri.converter):
+        source_data = {
+            'height': np.array([tree.height for tree in trees], dtype=float),
+            'breast_height_diameter': np.array([tree.breast_height_diameter for tree in trees], dtype=float),
+            'degree_days': np.array([stand.degree_days for stand in stands], dtype=float)[stand_index],
+            'species': robjects.StrVector([lmfor_species_map.get(tree.species, 'birch') for tree in trees]),
+            'model_type': robjects.StrVector(['scanned'])
+        }
+        df = robjects.DataFrame(source_data)
+        volumes = np.asarray(r['compute_tree_volumes'](df), dtype=float)
+
+    # bincount sums the volumes of each stand in tree order, as lmfor_volume does
+    totals = np.bincount(stand_index, volumes, minlength=len(stands))
+    return totals, np.split(volumes, np.cumsum(counts)[:-1])
+
+
 def convert_r_named_list_to_py_dict(named_list) -> Dict[Any, Any]:
     return dict(zip(named_list.names, [list(i) for i in named_list]))
@@ -0,0 +1,37 @@
+""" Ahead of time initialisation of the cross-cutting and volume backends """
+import time
+from typing import Sequence
+import numpy as np
+from lukefi.metsi.forestry.cross_cutting.cross_cutting import _cross_cut_fn, _cross_cut_many_fn
+
+BACKENDS = ("py", "lupa", "fhk", "lua", "r")
+
+# backends whose initialised state can be inherited by forked processes. The embedded R is initialised in each process.
+FORK_SAFE_BACKENDS = ("py", "lupa", "fhk", "lua")
+
+
+def warmup(price_tables: Sequence[np.ndarray] = (), backends: Sequence[str] = ("lupa", "fhk"), div: int = 10) -> dict[str, float]:
+    """
+    Initialises the given backends in the calling process and returns the time in seconds spent in the initialisation
+    of each backend.
+
+    For "lupa" the Lua runtimes executing crosscut.lua and for "fhk" (or "lua") the compiled FHK graphs of the per-tree
+    and batch cross-cut functions are built for each timber price table and segment length :div:. For "r" the
+    lmfor_volume.R script is sourced, which reads the volume models. The "py" implementation has no state to
+    initialise. Backends that are already initialised cost (almost) nothing.
+    """
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        raise ValueError(f"unknown backends {sorted(unknown)}")
+    timings = {}
+    for backend in backends:
+        start = time.perf_counter()
+        if backend == "r":
+            from lukefi.metsi.forestry import r_utils
+            r_utils.get_r_with_sourced_scripts()
+        elif backend != "py":
+            for P in price_tables:
+                _cross_cut_fn(P, div, backend)
+                _cross_cut_many_fn(P, div, backend)
+        timings[backend] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from lukefi.metsi.data.enums.internal import TreeSpecies
+from lukefi.metsi.forestry.cross_cutting.cross_cutting import ZERO_DIAMETER_DEFAULTS, cross_cut, price_table_digest
+from lukefi.metsi.forestry.cross_cutting.cross_cut_cache import CrossCutCache
+from tests.test_util import DEFAULT_TIMBER_PRICE_TABLE, TIMBER_PRICE_TABLE_THREE_GRADES
+
+
+class CrossCutCacheTest(unittest.TestCase):
+    def test_cached_result_equals_cross_cut_of_quantised_diameter(self):
+        cache = CrossCutCache(dbh_resolution=0.1)
+        nas, vol, val = cache.cross_cut(TreeSpecies.PINE, 30.04, 25.3, DEFAULT_TIMBER_PRICE_TABLE)
+        e_nas, e_vol, e_val = cross_cut(TreeSpecies.PINE, 30.0, 25, DEFAULT_TIMBER_PRICE_TABLE)
+        self.assertTrue(np.array_equal(e_nas, nas))
+        self.assertTrue(np.array_equal(e_vol, vol))
+        self.assertTrue(np.array_equal(e_val, val))
+        self.assertFalse(vol.flags.writeable)
+
+    def test_hits_and_misses(self):
+        cache = CrossCutCache(dbh_resolution=0.1)
+        first = cache.cross_cut(TreeSpecies.PINE, 30.01, 25.0, DEFAULT_TIMBER_PRICE_TABLE)
+        # same quantised diameter, rounded height and price table content
+        second = cache.cross_cut(TreeSpecies.PINE, 29.98, 24.6, DEFAULT_TIMBER_PRICE_TABLE.copy())
+        self.assertIs(first, second)
+        # silver and downy birch share the birch taper curve
+        cache.cross_cut(TreeSpecies.SILVER_BIRCH, 30.0, 25.0, DEFAULT_TIMBER_PRICE_TABLE)
+        cache.cross_cut(TreeSpecies.DOWNY_BIRCH, 30.0, 25.0, DEFAULT_TIMBER_PRICE_TABLE)
+        cache.cross_cut(TreeSpecies.PINE, 30.0, 25.0, TIMBER_PRICE_TABLE_THREE_GRADES)
+        info = cache.cache_info()
+        self.assertEqual((2, 3, 0, 3), (info.hits, info.misses, info.evictions, info.currsize))
+
+    def test_price_table_digested_once(self):
+        cache = CrossCutCache()
+        P = DEFAULT_TIMBER_PRICE_TABLE.copy()
+        cache.cross_cut(TreeSpecies.PINE, 30.0, 25.0, P)
+        cache.cross_cut(TreeSpecies.PINE, 20.0, 20.0, P)
+        self.assertEqual(1, len(cache._digests))
+        del P
+        self.assertEqual(0, len(cache._digests))
+
+    def test_eviction(self):
+        cache = CrossCutCache(maxsize=2)
+        for d in (10.0, 11.0, 12.0, 10.0):
+            cache.cross_cut(TreeSpecies.SPRUCE, d, 12.0, DEFAULT_TIMBER_PRICE_TABLE)
+        info = cache.cache_info()
+        self.assertEqual((0, 4, 2, 2), (info.hits, info.misses, info.evictions, info.currsize))
+        cache.cache_clear()
+        self.assertEqual((0, 0, 0, 2, 0), tuple(cache.cache_info()))
+
+    def test_zero_diameter(self):
+        cache = CrossCutCache()
+        self.assertEqual(ZERO_DIAMETER_DEFAULTS, cache.cross_cut(TreeSpecies.PINE, 0, 10, DEFAULT_TIMBER_PRICE_TABLE))
+        self.assertEqual(ZERO_DIAMETER_DEFAULTS, cache.cross_cut(TreeSpecies.PINE, None, 10, DEFAULT_TIMBER_PRICE_TABLE))
+        self.assertRaises(ValueError, cache.cross_cut, *(TreeSpecies.PINE, -1, 10, DEFAULT_TIMBER_PRICE_TABLE))
+        self.assertEqual(0, cache.cache_info().currsize)
+
+    def test_price_table_digest(self):
+        P = DEFAULT_TIMBER_PRICE_TABLE
+        self.assertEqual(price_table_digest(P), price_table_digest(P.copy()))
+        self.assertNotEqual(price_table_digest(P), price_table_digest(P[:-1]))
+        self.assertNotEqual(price_table_digest(P), price_table_digest(P.T))
@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+from lukefi.metsi.data.enums.internal import TreeSpecies
+from lukefi.metsi.forestry.cross_cutting import cross_cutting
+from lukefi.metsi.forestry.cross_cutting.cross_cutting import cross_cut, cross_cut_many, register_cross_cut_table
+from lukefi.metsi.forestry.cross_cutting.cross_cut_table import CrossCutTable
+from tests.test_util import TIMBER_PRICE_TABLE_THREE_GRADES
+
+
+class CrossCutTableTest(unittest.TestCase):
+    P = TIMBER_PRICE_TABLE_THREE_GRADES
+
+    @classmethod
+    def setUpClass(cls):
+        cls.table = CrossCutTable.build(cls.P, dbh_grid=np.arange(10.0, 31.0, 5.0), heights=np.arange(15, 21))
+
+    def tearDown(self):
+        cross_cutting._cross_cut_tables.clear()
+
+    def test_grid_points_equal_exact_results(self):
+        for species in (TreeSpecies.PINE, TreeSpecies.SPRUCE, TreeSpecies.SILVER_BIRCH):
+            nas, vol, val = self.table.lookup(cross_cutting._cross_cut_species_mapper[species], 20.0, 17.2)
+            e_nas, e_vol, e_val = cross_cut(species, 20.0, 17.2, self.P)
+            self.assertTrue(np.array_equal(e_nas, nas))
+            self.assertTrue(np.allclose(e_vol, vol, rtol=0, atol=1e-12))
+            self.assertTrue(np.allclose(e_val, val, rtol=0, atol=1e-12))
+
+    def test_interpolation_over_diameter(self):
+        _, vol, val = self.table.lookup("pine", 21.0, 18)
+        _, vol20, val20 = cross_cut(TreeSpecies.PINE, 20.0, 18, self.P)
+        _, vol25, val25 = cross_cut(TreeSpecies.PINE, 25.0, 18, self.P)
+        self.assertTrue(np.allclose(0.8 * vol20 + 0.2 * vol25, vol))
+        self.assertTrue(np.allclose(0.8 * val20 + 0.2 * val25, val))
+
+    def test_out_of_range(self):
+        self.assertIsNone(self.table.lookup("pine", 9.9, 18))
+        self.assertIsNone(self.table.lookup("pine", 30.1, 18))
+        self.assertIsNone(self.table.lookup("pine", 20.0, 22))
+        self.assertIsNotNone(self.table.lookup("pine", 30.0, 20.4))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "table"
+            self.table.save(path)
+            loaded = CrossCutTable.load(path)
+            self.assertIsInstance(loaded.grid, np.memmap)
+            self.assertTrue(np.array_equal(self.table.grid, loaded.grid))
+            self.assertTrue(np.array_equal(self.P, loaded.P))
+            self.assertEqual(self.table.div, loaded.div)
+            self.assertTrue(np.array_equal(self.table.lookup("spruce", 12.3, 16)[1], loaded.lookup("spruce", 12.3, 16)[1]))
+            del loaded
+
+    def test_table_impl(self):
+        species = [TreeSpecies.PINE, TreeSpecies.SPRUCE, TreeSpecies.DOWNY_BIRCH, TreeSpecies.PINE, TreeSpecies.PINE]
+        diameters = [12.3, 28.8, 17.5, 35.0, 0.0]
+        heights = [15.4, 19.6, 17.0, 18.0, 1.0]
+        # without a registered table the exact solver is used
+        grades, exact_volumes, exact_values = cross_cut_many(species, diameters, heights, self.P, impl="table")
+        _, py_volumes, _ = cross_cut_many(species, diameters, heights, self.P)
+        self.assertTrue(np.array_equal(py_volumes, exact_volumes))
+
+        register_cross_cut_table(self.table)
+        grades, volumes, values = cross_cut_many(species, diameters, heights, self.P, impl="table")
+        for i, (spe, d, h) in enumerate(zip(species, diameters, heights)):
+            nas, vol, val = cross_cut(spe, d, h, self.P, impl="table")
+            columns = np.searchsorted(grades, nas)
+            self.assertTrue(np.allclose(vol, volumes[i, columns]))
+            self.assertTrue(np.allclose(val, values[i, columns]))
+        # the tree outside the table is exact. Interpolation may blend the assortments of the neighbouring grid
+        # diameters, but the total volume stays close to exact.
+        self.assertTrue(np.array_equal(exact_volumes[3], volumes[3]))
+        self.assertTrue(np.allclose(exact_volumes.sum(axis=1), volumes.sum(axis=1), rtol=0.05))
@@ -0,0 +1,172 @@
+"""
+Benchmark of the cross-cutting implementations.
+
+Cross-cuts a realistic set of trees generated with tree_generation.trees_from_weibull from a range of pine, spruce and
+birch strata with each implementation, and reports the throughput (trees/s), the per-tree latency percentiles and the
+cold start cost, i.e. the time of the first cross-cut with empty implementation caches (Lua runtime initialisation and
+FHK graph construction). The batch implementations of cross_cut_many are reported as "<impl>-many".
+
+The R implementation in tests/resources/cross_cutting uses its own timber price table and is run only if rpy2 is
+installed and the working directory is the repository root.
+
+Usage: python -m tests.cross_cutting_benchmark [--trees-per-stratum N] [--table default|three_grades] [--backends ...]
+"""
+import argparse
+import os
+import time
+from typing import Callable, NamedTuple, Optional, Sequence
+import numpy as np
+from lukefi.metsi.data.enums.internal import TreeSpecies
+from lukefi.metsi.data.model import TreeStratum
+from lukefi.metsi.forestry.cross_cutting import cross_cutting_fhk, cross_cutting_lupa
+from lukefi.metsi.forestry.cross_cutting.cross_cutting import _cross_cut_species_mapper, cross_cut, cross_cut_many
+from lukefi.metsi.forestry.preprocessing.tree_generation import trees_from_weibull
+from tests.test_util import DEFAULT_TIMBER_PRICE_TABLE, TIMBER_PRICE_TABLE_THREE_GRADES
+
+try:
+    import rpy2.robjects as robjects
+except ImportError:
+    robjects = None
+
+PRICE_TABLES = {
+    "default": DEFAULT_TIMBER_PRICE_TABLE,
+    "three_grades": TIMBER_PRICE_TABLE_THREE_GRADES
+}
+
+BACKENDS = ("py", "lupa", "fhk", "r", "py-many", "lupa-many", "fhk-many")
+
+# species, mean diameter (cm), mean height (m), basal area (m2/ha) of the generated strata
+STRATA = [
+    (TreeSpecies.PINE, 8.0, 7.0, 6.0),
+    (TreeSpecies.PINE, 18.0, 15.0, 14.0),
+    (TreeSpecies.PINE, 28.0, 21.0, 22.0),
+    (TreeSpecies.SPRUCE, 12.0, 10.0, 10.0),
+    (TreeSpecies.SPRUCE, 22.0, 19.0, 18.0),
+    (TreeSpecies.SPRUCE, 34.0, 27.0, 26.0),
+    (TreeSpecies.SILVER_BIRCH, 10.0, 11.0, 4.0),
+    (TreeSpecies.DOWNY_BIRCH, 20.0, 18.0, 8.0),
+]
+
+
+class BenchmarkResult(NamedTuple):
+    backend: str
+    n_trees: int
+    cold_start: float
+    trees_per_second: float
+    p50: float
+    p90: float
+    p99: float
+
+
+def generate_trees(trees_per_stratum: int) -> tuple[list[TreeSpecies], np.ndarray, np.ndarray]:
+    """ Returns the species, diameters and heights of the trees generated from STRATA. """
+    species, dbh, height = [], [], []
+    for spe, mean_diameter, mean_height, basal_area in STRATA:
+        stratum = TreeStratum()
+        stratum.species = spe
+        stratum.mean_diameter = mean_diameter
+        stratum.mean_height = mean_height
+        stratum.basal_area = basal_area
+        for tree in trees_from_weibull(stratum, trees_per_stratum):
+            if tree.breast_height_diameter > 0 and tree.height >= 2:
+                species.append(spe)
+                dbh.append(tree.breast_height_diameter)
+                height.append(tree.height)
+    return species, np.array(dbh), np.array(height)
+
+
+def clear_caches() -> None:
+    """ Drops the cached Lua runtimes and FHK graphs, so that the next cross-cut of each backend is a cold start. """
+    cross_cutting_lupa.cross_cut_lupa.cache_clear()
+    cross_cutting_lupa.cross_cut_lupa_many.cache_clear()
+    cross_cutting_fhk.cross_cut_fhk.cache_clear()
+    cross_cutting_fhk.cross_cut_fhk_many.cache_clear()
+    cross_cutting_fhk._fhk_query.cache_clear()
+
+
+def _r_cross_cut() -> Callable:
+    r = robjects.r
+    r.source("./tests/resources/cross_cutting/cross_cutting_main.R")
+    fn = r["cross_cut"]
+    return lambda spe, d, h: fn(_cross_cut_species_mapper.get(spe, "birch"), d, round(h))
+
+
+def _summarise(backend: str, cold_start: float, latencies: np.ndarray) -> BenchmarkResult:
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return BenchmarkResult(backend, len(latencies), cold_start, len(latencies) / latencies.sum(), p50, p90, p99)
+
+
+def benchmark_per_tree(backend: str, species: Sequence[TreeSpecies], dbh: np.ndarray, height: np.ndarray, P: np.ndarray, div: int = 10) -> BenchmarkResult:
+    """ Cross-cuts the trees one by one with cross_cut (or the R implementation) and records the latency of each tree. """
+    clear_caches()
+    start = time.perf_counter()
+    if backend == "r":
+        cc = _r_cross_cut()
+    else:
+        cc = lambda spe, d, h: cross_cut(spe, d, h, P, div, backend)
+    cc(species[0], dbh[0], height[0])
+    cold_start = time.perf_counter() - start
+    latencies = np.zeros(len(dbh))
+    for i, (spe, d, h) in enumerate(zip(species, dbh, height)):
+        start = time.perf_counter()
+        cc(spe, d, h)
+        latencies[i] = time.perf_counter() - start
+    return _summarise(backend, cold_start, latencies)
+
+
+def benchmark_many(backend: str, species: Sequence[TreeSpecies], dbh: np.ndarray, height: np.ndarray, P: np.ndarray, div: int = 10, batch_size: int = 1000) -> BenchmarkResult:
+    """
+    Cross-cuts the trees in batches of :batch_size: with cross_cut_many. The latency percentiles are those of the
+    batches divided by their size.
+    """
+    impl = backend[:-len("-many")]
+    clear_caches()
+    start = time.perf_counter()
+    cross_cut_many(species[:1], dbh[:1], height[:1], P, div, impl)
+    cold_start = time.perf_counter() - start
+    latencies = []
+    for lo in range(0, len(dbh), batch_size):
+        hi = min(lo + batch_size, len(dbh))
+        start = time.perf_counter()
+        cross_cut_many(species[lo:hi], dbh[lo:hi], height[lo:hi], P, div, impl)
+        latencies.append(np.full(hi - lo, (time.perf_counter() - start) / (hi - lo)))
+    latencies = np.concatenate(latencies)
+    return _summarise(backend, cold_start, latencies)
+
+
+def run(backends: Sequence[str], trees_per_stratum: int = 50, table: str = "default", div: int = 10) -> list[BenchmarkResult]:
+    species, dbh, height = generate_trees(trees_per_stratum)
+    P = PRICE_TABLES[table]
+    results = []
+    for backend in backends:
+        if backend == "r" and (robjects is None or not os.path.exists("./tests/resources/cross_cutting/cross_cutting_main.R")):
+            print("skipping r: rpy2 not installed or not run from the repository root")
+            continue
+        if backend.endswith("-many"):
+            results.append(benchmark_many(backend, species, dbh, height, P, div))
+        else:
+            results.append(benchmark_per_tree(backend, species, dbh, height, P, div))
+    return results
+
+
+def format_results(results: Sequence[BenchmarkResult]) -> str:
+    lines = [f"{'backend':<10} {'trees':>7} {'cold start ms':>14} {'trees/s':>10} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9}"]
+    for r in results:
+        lines.append(
+            f"{r.backend:<10} {r.n_trees:>7} {r.cold_start * 1e3:>14.1f} {r.trees_per_second:>10.0f} "
+            f"{r.p50 * 1e6:>9.0f} {r.p90 * 1e6:>9.0f} {r.p99 * 1e6:>9.0f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the cross-cutting implementations.")
+    parser.add_argument("--trees-per-stratum", type=int, default=50)
+    parser.add_argument("--table", choices=PRICE_TABLES.keys(), default="default")
+    parser.add_argument("--div", type=int, default=10)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    args = parser.parse_args(argv)
+    print(format_results(run(args.backends, args.trees_per_stratum, args.table, args.div)))
+
+
+if __name__ == "__main__":
+    main()
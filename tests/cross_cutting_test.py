@@ -3,8 +3,9 @@ import unittest
 import numpy as np
 from lukefi.metsi.data.enums.internal import TreeSpecies
 from parameterized import parameterized
-from lukefi.metsi.forestry.cross_cutting.cross_cutting import ZERO_DIAMETER_DEFAULTS, cross_cut, _cross_cut_species_mapper
-from tests.test_util import DEFAULT_TIMBER_PRICE_TABLE, TestCaseExtension
+from lukefi.metsi.forestry.cross_cutting import cross_cutting_lupa, stem_profile
+from lukefi.metsi.forestry.cross_cutting.cross_cutting import ZERO_DIAMETER_DEFAULTS, apteeraus_Nasberg, apteeraus_Nasberg_vectorised, cross_cut, cross_cut_many, _cross_cut_many_fn, _cross_cut_species_mapper
+from tests.test_util import DEFAULT_TIMBER_PRICE_TABLE, TIMBER_PRICE_TABLE_THREE_GRADES, TestCaseExtension
 
 unrunnable = False
 try:
@@ -54,6 +55,18 @@ class CrossCuttingTest(TestCaseExtension):
         self.assertTrue(np.allclose(val_fhk, np.array(val_r), atol=10e-6))
         self.assertTrue(np.allclose(val_py, np.array(val_r), atol=10e-6))
 
+    def test_fhk_batch_equals_fhk(self):
+        species = [TreeSpecies.PINE, TreeSpecies.UNKNOWN_CONIFEROUS, TreeSpecies.SPRUCE, TreeSpecies.SILVER_BIRCH]
+        diameters = [30.0, 15.57254199723247, 17.721245087039236, 0.0]
+        heights = [25.0, 18.293846547993535, 16.353742669109522, 1.0]
+        P = TIMBER_PRICE_TABLE_THREE_GRADES
+        grades, volumes, values = cross_cut_many(species, diameters, heights, P, impl="fhk")
+        for i, (spe, d, h) in enumerate(zip(species, diameters, heights)):
+            nas, vol, val = cross_cut(spe, d, h, P, impl="fhk")
+            columns = np.searchsorted(grades, nas)
+            self.assertTrue(np.allclose(vol, volumes[i, columns], rtol=0, atol=1e-12))
+            self.assertTrue(np.allclose(val, values[i, columns], rtol=0, atol=1e-12))
+
     def test_cross_cut_zero_dbh_tree_returns_constant_values(self):
         for dbh in [0, None]:
             unique_timber_grades, volumes, values = cross_cut(TreeSpecies.PINE, dbh, 10, DEFAULT_TIMBER_PRICE_TABLE)
@@ -62,3 +75,91 @@ class CrossCuttingTest(TestCaseExtension):
             self.assertEqual(volumes[0], ZERO_DIAMETER_DEFAULTS[1][0])
             self.assertEqual(values[0], ZERO_DIAMETER_DEFAULTS[2][0])
         self.assertRaises(ValueError, cross_cut, *(TreeSpecies.PINE, -1, 10, DEFAULT_TIMBER_PRICE_TABLE))
+
+
+class CrossCutManyTest(unittest.TestCase):
+    def test_cross_cut_many_equals_cross_cut(self):
+        species = [TreeSpecies.PINE, TreeSpecies.SPRUCE, TreeSpecies.SILVER_BIRCH, TreeSpecies.PINE, TreeSpecies.UNKNOWN_CONIFEROUS]
+        diameters = [30.0, 17.721245087039236, 0.0, None, 15.57254199723247]
+        heights = [25.0, 16.353742669109522, 1.0, 1.2, 18.293846547993535]
+        P = TIMBER_PRICE_TABLE_THREE_GRADES
+        grades, volumes, values = cross_cut_many(species, diameters, heights, P)
+        self.assertEqual([1, 2, 3], list(grades))
+        self.assertEqual((5, 3), volumes.shape)
+        self.assertEqual((5, 3), values.shape)
+        for i, (spe, d, h) in enumerate(zip(species, diameters, heights)):
+            nas, vol, val = cross_cut(spe, d, h, P)
+            columns = np.searchsorted(grades, nas)
+            self.assertTrue(np.array_equal(vol, volumes[i, columns]))
+            self.assertTrue(np.array_equal(val, values[i, columns]))
+
+    def test_unknown_implementation(self):
+        P = DEFAULT_TIMBER_PRICE_TABLE
+        self.assertRaises(ValueError, cross_cut, TreeSpecies.PINE, 30.0, 25.0, P, 10, "lupaa")
+        self.assertRaises(ValueError, cross_cut_many, [TreeSpecies.PINE], [30.0], [25.0], P, 10, "pyy")
+        self.assertRaises(ValueError, _cross_cut_many_fn, P, 10, "py")
+
+    def test_cross_cut_many_zero_diameter_trees(self):
+        grades, volumes, values = cross_cut_many([TreeSpecies.PINE]*2, [0, None], [10, 10], DEFAULT_TIMBER_PRICE_TABLE)
+        self.assertEqual([1, 2, 3], list(grades))
+        self.assertTrue(np.array_equal(volumes, [[0, 0, ZERO_DIAMETER_DEFAULTS[1][0]]]*2))
+        self.assertTrue(np.array_equal(values, [[0, 0, ZERO_DIAMETER_DEFAULTS[2][0]]]*2))
+        self.assertRaises(ValueError, cross_cut_many, *([TreeSpecies.PINE], [-1], [10], DEFAULT_TIMBER_PRICE_TABLE))
+
+    def test_cross_cut_many_lupa_equals_cross_cut_lupa(self):
+        species = [TreeSpecies.PINE, TreeSpecies.SPRUCE, TreeSpecies.SILVER_BIRCH, TreeSpecies.UNKNOWN_CONIFEROUS, TreeSpecies.PINE]
+        diameters = [30.0, 17.721245087039236, 25.5, 15.57254199723247, 0.0]
+        heights = [25.0, 16.353742669109522, 22.5, 18.293846547993535, 1.0]
+        P = TIMBER_PRICE_TABLE_THREE_GRADES
+        grades, volumes, values = cross_cut_many(species, diameters, heights, P, impl="lupa")
+        for i, (spe, d, h) in enumerate(zip(species, diameters, heights)):
+            nas, vol, val = cross_cut(spe, d, h, P, impl="lupa")
+            columns = np.searchsorted(grades, nas)
+            self.assertTrue(np.array_equal(vol, volumes[i, columns]))
+            self.assertTrue(np.array_equal(val, values[i, columns]))
+
+    def test_cross_cut_many_lupa_in_several_calls(self):
+        species = [TreeSpecies.PINE, TreeSpecies.SPRUCE, TreeSpecies.SILVER_BIRCH] * 5
+        diameters = np.linspace(8.0, 40.0, len(species))
+        heights = np.linspace(8.0, 30.0, len(species))
+        P = TIMBER_PRICE_TABLE_THREE_GRADES
+        expected = cross_cut_many(species, diameters, heights, P, impl="lupa")
+        max_batch_results = cross_cutting_lupa.MAX_BATCH_RESULTS
+        try:
+            # batches of 2 trees
+            cross_cutting_lupa.MAX_BATCH_RESULTS = 4 * len(expected[0])
+            cross_cutting_lupa.cross_cut_lupa_many.cache_clear()
+            result = cross_cut_many(species, diameters, heights, P, impl="lupa")
+        finally:
+            cross_cutting_lupa.MAX_BATCH_RESULTS = max_batch_results
+            cross_cutting_lupa.cross_cut_lupa_many.cache_clear()
+        for e, r in zip(expected, result):
+            self.assertTrue(np.array_equal(e, r))
+
+    def test_cross_cut_with_stem_profile_cache(self):
+        profiles = stem_profile.StemProfileCache()
+        for P in (DEFAULT_TIMBER_PRICE_TABLE, TIMBER_PRICE_TABLE_THREE_GRADES):
+            expected = cross_cut(TreeSpecies.SPRUCE, 17.721245087039236, 16.353742669109522, P)
+            result = cross_cut(TreeSpecies.SPRUCE, 17.721245087039236, 16.353742669109522, P, profiles=profiles)
+            for e, r in zip(expected, result):
+                self.assertTrue(np.array_equal(e, r))
+        self.assertEqual((1, 1), (profiles.hits, profiles.misses))
+
+
+class ApteerausNasbergTest(unittest.TestCase):
+    @parameterized.expand([
+        ("pine", 30.0, 25, DEFAULT_TIMBER_PRICE_TABLE),
+        ("spruce", 17.721245087039236, 16, TIMBER_PRICE_TABLE_THREE_GRADES),
+        ("birch", 45.0, 31, TIMBER_PRICE_TABLE_THREE_GRADES),
+        ("birch", 8.0, 9, DEFAULT_TIMBER_PRICE_TABLE),
+        # equal prices and lengths for different grades produce ties between the price table rows
+        ("pine", 35.0, 28, np.array([[1., 160., 400., 50.], [2., 70., 400., 50.], [2., 70., 300., 50.], [1., 160., 300., 50.]]))
+    ])
+    def test_vectorised_equals_sequential(self, species, dbh, height, P):
+        n = int((height*100)/10-1)
+        T = stem_profile.create_tree_stem_profile(species, dbh, height, n)
+        expected = apteeraus_Nasberg(T, P, P.shape[0], n, 10)
+        result = apteeraus_Nasberg_vectorised(T, P, P.shape[0], n, 10)
+        for e, r in zip(expected, result):
+            self.assertTrue(np.array_equal(e, r))
+
@@ -1,4 +1,6 @@
+import statistics
 import unittest
+import numpy as np
 from lukefi.metsi.forestry import forestry_utils as futil
 from lukefi.metsi.data.model import ReferenceTree, ForestStand
 from lukefi.metsi.data.enums.internal import TreeSpecies
@@ -133,3 +135,84 @@ class ForestryUtilsTest(unittest.TestCase):
             stand.reference_trees.append(reference_tree)
         self.assertEqual(43.92307692307692,futil.mean_age_stand(stand))
  
+
+    def test_tree_arrays_aggregates_equal_reference_tree_aggregates(self):
+        stand = ForestStand()
+        stand.reference_trees = [
+            ReferenceTree(breast_height_diameter=10.0 + (i % 7), height=8.0 + i/3, stems_per_ha=20.0 + 3 * i,
+                          species=[1, 2, 3][i % 3], biological_age=30.0 + i)
+            for i in range(1, 30)
+        ]
+        trees = futil.TreeArrays.from_trees(stand.reference_trees)
+        self.assertEqual(29, len(trees))
+        self.assertEqual(futil.overall_basal_area(stand.reference_trees), futil.overall_basal_area_arrays(trees))
+        self.assertEqual(futil.overall_stems_per_ha(stand.reference_trees), futil.overall_stems_per_ha_arrays(trees))
+        self.assertEqual(futil.solve_dominant_species(stand.reference_trees), futil.solve_dominant_species_arrays(trees))
+        self.assertEqual(futil.solve_dominant_height(stand.reference_trees), futil.solve_dominant_height_arrays(trees))
+        self.assertEqual(futil.mean_age_stand(stand), futil.mean_age_arrays(trees))
+        f = lambda x: x.height * futil.calculate_basal_area(x)
+        self.assertEqual(
+            futil.calculate_basal_area_weighted_attribute_sum(stand.reference_trees, f),
+            futil.calculate_basal_area_weighted_attribute_sum_arrays(trees, trees.height))
+        for c in (50, 100, 10000):
+            self.assertEqual(futil.solve_dominant_height_c_largest(stand, c), futil.solve_dominant_height_c_largest_arrays(trees, c))
+
+    def test_tree_arrays_dominant_species_tie(self):
+        trees = [ReferenceTree(breast_height_diameter=10.0, stems_per_ha=10.0, species=s) for s in (2, 1, 1, 2)]
+        self.assertEqual(2, futil.solve_dominant_species_arrays(futil.TreeArrays.from_trees(trees)))
+        self.assertEqual(None, futil.solve_dominant_species_arrays(futil.TreeArrays.from_trees([])))
+
+    def test_tree_arrays_dominant_height_without_trees(self):
+        self.assertRaises(statistics.StatisticsError, futil.solve_dominant_height, [])
+        self.assertRaises(statistics.StatisticsError, futil.solve_dominant_height_arrays, futil.TreeArrays.from_trees([]))
+
+    def test_stand_summary(self):
+        stand = ForestStand()
+        self.assertEqual(futil.StandSummary(0, 0, None, 0, 0, 0, {}), futil.stand_summary(stand))
+        stand.reference_trees = [
+            ReferenceTree(breast_height_diameter=10.0 + (i % 7), height=8.0 + i/3, stems_per_ha=20.0 + 3 * i,
+                          species=[1, 2, 3][i % 3], biological_age=30.0 + i)
+            for i in range(1, 30)
+        ]
+        summary = futil.stand_summary(stand)
+        self.assertEqual(futil.overall_basal_area(stand.reference_trees), summary.basal_area)
+        self.assertEqual(futil.overall_stems_per_ha(stand.reference_trees), summary.stems_per_ha)
+        self.assertEqual(futil.solve_dominant_species(stand.reference_trees), summary.dominant_species)
+        self.assertEqual(futil.solve_dominant_height(stand.reference_trees), summary.dominant_height)
+        self.assertEqual(futil.solve_dominant_height_c_largest(stand), summary.dominant_diameter_c_largest)
+        self.assertEqual(futil.mean_age_stand(stand), summary.mean_age)
+        self.assertEqual([2, 3, 1], list(summary.species.keys()))
+        pines = [rt for rt in stand.reference_trees if rt.species == 1]
+        self.assertEqual(futil.overall_basal_area(pines), summary.species[1].basal_area)
+        f = lambda x: x.height * futil.calculate_basal_area(x)
+        self.assertAlmostEqual(futil.calculate_basal_area_weighted_attribute_sum(pines, f), summary.species[1].mean_height, 12)
+
+    def test_solve_dominant_height_c_largest_selection(self):
+        # many ties and a stand large enough to select a subset of the trees
+        diameters = [float(5 + (i * 7) % 31) for i in range(400)]
+        stems = [float(1 + (i * 3) % 11) for i in range(400)]
+        stand = ForestStand()
+        stand.reference_trees = [ReferenceTree(breast_height_diameter=d, stems_per_ha=f) for d, f in zip(diameters, stems)]
+        trees = futil.TreeArrays.from_trees(stand.reference_trees)
+        for c in (1, 17, 100, 1000, 10000):
+            self.assertEqual(futil.solve_dominant_height_c_largest(stand, c), futil.solve_dominant_height_c_largest_arrays(trees, c))
+
+    def test_solve_dominant_height_c_largest_many(self):
+        stands = [
+            ([18.1, 5.7], [82, 30]),
+            ([], []),
+            ([50.1, 35.9], [13, 51]),
+            ([12.0, 30.0, 12.0, 25.5, 30.0], [40.0, 20.0, 35.5, 10.0, 15.0]),
+            ([float(x % 7) for x in range(40)], [1.5 + x % 5 for x in range(40)])
+        ]
+        offsets = np.cumsum([0] + [len(d) for d, _ in stands])
+        d = np.concatenate([d for d, _ in stands])
+        f = np.concatenate([f for _, f in stands])
+        for c in (50, 100):
+            expected = []
+            for diameters, stems in stands:
+                stand = ForestStand()
+                stand.reference_trees = [ReferenceTree(breast_height_diameter=x, stems_per_ha=w) for x, w in zip(diameters, stems)]
+                expected.append(futil.solve_dominant_height_c_largest(stand, c))
+            self.assertEqual(expected, list(futil.solve_dominant_height_c_largest_many(d, f, offsets, c)))
+        self.assertRaises(ValueError, futil.solve_dominant_height_c_largest_many, d, f, [0, 2, 1, 9])
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from lukefi.metsi.data.model import ReferenceTree
 from lukefi.metsi.forestry.naturalprocess import grow_acta
 
@@ -87,3 +88,66 @@ class GrowActaTest(unittest.TestCase):
         self.assertEqual(0.8, resh[0])
         self.assertEqual(1.2, resh[1])
         self.assertEqual(1.5, resh[2])
+
+    def test_grow_diameter_and_height_array_equals_grow_diameter_and_height(self):
+        diameters = [20.0, 12.5, 31.0, 0.0, 8.2, 0.0, 15.0]
+        heights = [22.0, 14.0, 27.5, 1.1, 9.0, 0.4, 16.0]
+        stems = [250.0, 400.0, 120.0, 1500.0, 600.0, 2000.0, 300.0]
+        species = [1, 2, 1, 2, 3, 1, 3]
+        ages = [51.0, 30.0, 70.0, 8.0, 25.0, 3.0, 40.0]
+        reference_trees = [
+            ReferenceTree(
+                breast_height_diameter=d,
+                height=h,
+                stems_per_ha=f,
+                species=spe,
+                biological_age=age)
+            for d, h, f, spe, age in zip(diameters, heights, stems, species, ages)
+        ]
+        for step in (1, 5, 10):
+            resd, resh = grow_acta.grow_diameter_and_height(reference_trees, step=step)
+            arrd, arrh = grow_acta.grow_diameter_and_height_array(diameters, heights, ages, stems, species, step=step)
+            self.assertTrue(np.allclose(resd, arrd, rtol=1e-12, atol=0))
+            self.assertTrue(np.allclose(resh, arrh, rtol=1e-12, atol=0))
+
+    def test_grow_sapling_array(self):
+        resd, resh = grow_acta.grow_diameter_and_height_array([0.0, 1.1, 0.0], [0.5, 0.9, 1.2], [1, 1, 1], [1, 1, 1], [1, 1, 1], step=1)
+        self.assertEqual([0.0, 1.1, 1.0], list(resd))
+        self.assertTrue(np.allclose([0.8, 1.2, 1.5], resh))
+
+    def test_array_raises_where_scalar_raises(self):
+        cases = [
+            # a species group without basal area in a stand with grown trees
+            (([20.0, 0.0], [22.0, 1.5], [250.0, 400.0], [1, 2], [51.0, 30.0]), ZeroDivisionError),
+            # the logarithm of a zero diameter of a grown tree
+            (([20.0, 0.0], [22.0, 1.5], [250.0, 400.0], [1, 1], [51.0, 30.0]), ValueError),
+        ]
+        for (d, h, f, spe, age), error in cases:
+            reference_trees = [
+                ReferenceTree(breast_height_diameter=dd, height=hh, stems_per_ha=ff, species=ss, biological_age=aa)
+                for dd, hh, ff, ss, aa in zip(d, h, f, spe, age)
+            ]
+            self.assertRaises(error, grow_acta.grow_diameter_and_height, reference_trees, 1)
+            self.assertRaises(error, grow_acta.grow_diameter_and_height_array, d, h, age, f, spe, 1)
+
+    def test_grow_diameter_and_height_many(self):
+        stands = [
+            ([20.0, 12.5, 31.0, 0.0], [22.0, 14.0, 27.5, 1.1], [250.0, 400.0, 120.0, 1500.0], [1, 2, 1, 2], [51.0, 30.0, 70.0, 8.0]),
+            ([], [], [], [], []),
+            ([0.0, 0.0], [0.4, 1.2], [2000.0, 1000.0], [3, 3], [3.0, 5.0]),
+            ([8.2, 15.0, 16.0], [9.0, 16.0, 14.0], [600.0, 300.0, 200.0], [3, 3, 2], [25.0, 40.0, 41.0])
+        ]
+        offsets = np.cumsum([0] + [len(stand[0]) for stand in stands])
+        d, h, f, spe, age = (np.concatenate([stand[k] for stand in stands]) for k in range(5))
+        resd, resh = grow_acta.grow_diameter_and_height_many(d, h, age, f, spe, offsets, step=5)
+        for i, (sd, sh, sf, sspe, sage) in enumerate(stands):
+            reference_trees = [
+                ReferenceTree(breast_height_diameter=dd, height=hh, stems_per_ha=ff, species=ss, biological_age=aa)
+                for dd, hh, ff, ss, aa in zip(sd, sh, sf, sspe, sage)
+            ]
+            expected_d, expected_h = grow_acta.grow_diameter_and_height(reference_trees, step=5)
+            self.assertTrue(np.allclose(expected_d, resd[offsets[i]:offsets[i+1]], rtol=1e-12, atol=0))
+            self.assertTrue(np.allclose(expected_h, resh[offsets[i]:offsets[i+1]], rtol=1e-12, atol=0))
+        self.assertRaises(ValueError, grow_acta.grow_diameter_and_height_many, d, h, age, f, spe, [0, 5, 3, 9])
+        self.assertRaises(ValueError, grow_acta.grow_diameter_and_height_many, d, h, age, f, spe - 4, offsets)
+        self.assertRaises(ValueError, grow_acta.grow_diameter_and_height_many, d, h, age, f, spe + 0.5, offsets)
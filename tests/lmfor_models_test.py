@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+from lukefi.metsi.data.enums.internal import TreeSpecies
+from lukefi.metsi.data.model import ForestStand, ReferenceTree
+from lukefi.metsi.forestry import lmfor_models
+
+try:
+    import rdata
+except ImportError:
+    rdata = None
+
+
+class LmforModelsTest(unittest.TestCase):
+    def test_volume_model_parameters(self):
+        dbh, h, temp_sum = 20.3, 10.4, 720.3
+        c = lmfor_models.volume_model_coefficients()["pine"]["logita"]
+        expected = (c["(Intercept)"] + c["I(1/h)"] / h + c["h"] * h + c["dbh"] * dbh + c["I(1/(h * dbh))"] / (h * dbh)
+                    + c["temp_sum"] * temp_sum + c["datasetscanned"] + c["dbh:temp_sum"] * dbh * temp_sum
+                    + c["h:temp_sum"] * h * temp_sum + c["dbh:datasetscanned"] * dbh + c["h:datasetscanned"] * h)
+        logita, lam = lmfor_models.volume_model_parameters(
+            [dbh, 14.3, dbh], [h, 13.4, h], temp_sum, ["pine", "birch", "pine"], ["scanned", "scanned", "climbed"])
+        self.assertAlmostEqual(expected, logita[0], 12)
+        self.assertEqual(lmfor_models.volume_model_coefficients()["pine"]["lambda"], lam[0])
+        self.assertEqual(lmfor_models.volume_model_coefficients()["birch"]["lambda"], lam[1])
+        self.assertAlmostEqual(logita[0] - c["datasetscanned"] - c["dbh:datasetscanned"] * dbh - c["h:datasetscanned"] * h, logita[2], 12)
+
+    def test_unknown_species(self):
+        self.assertRaises(ValueError, lmfor_models.volume_model_parameters, [20.0], [10.0], [700.0], ["larch"], ["scanned"])
+
+    @unittest.skipIf(rdata is None, "rdata not installed")
+    def test_coefficients_equal_rds(self):
+        parsed = rdata.parser.parse_file(lmfor_models.VOLUME_MODEL_COEFFICIENTS.with_name("vol_mods_final_LM.rds"))
+        models = parsed.object.value[2].value
+        for i, spe in enumerate(lmfor_models.SPECIES):
+            fixed = models[i].value[3].value[0].value
+            coefficients = lmfor_models.volume_model_coefficients()[spe]
+            self.assertTrue(np.array_equal(fixed, list(coefficients["logita"].values()) + [coefficients["lambda"]]))
+
+    @unittest.skipIf(rdata is None, "rdata not installed")
+    def test_volumes_equal_rds_fitted_volumes(self):
+        parsed = rdata.parser.parse_file(lmfor_models.VOLUME_MODEL_COEFFICIENTS.with_name("vol_mods_final_LM.rds"))
+        converter = rdata.conversion.SimpleConverter()
+        models = parsed.object.value[2].value
+        for i in range(len(lmfor_models.SPECIES)):
+            design = converter.convert(models[i].value[14].value[0].value[0])
+            fitted = converter.convert(models[i].value[12]).sel(dim_0=design.dim_0, dim_1="fixed")
+            def column(name: str) -> np.ndarray:
+                return design.sel(dim_1=name).values
+            model_type = np.where(column("datasetscanned") == 1, "scanned",
+                                  np.where(column("datasetfelled") == 1, "felled", "climbed"))
+            volumes = lmfor_models.compute_tree_volumes(
+                column("dbh"), column("h"), column("temp_sum"), np.full(len(design), lmfor_models.SPECIES[i]), model_type)
+            self.assertTrue(np.allclose(fitted.values, volumes, rtol=1e-12, atol=0))
+
+    def test_lmfor_volume(self):
+        fixture = ForestStand(degree_days=720.3)
+        fixture.reference_trees = [
+            ReferenceTree(height=10.4, breast_height_diameter=20.3, species=TreeSpecies.PINE),
+            ReferenceTree(height=13.4, breast_height_diameter=14.3, species=TreeSpecies.SILVER_BIRCH)
+        ]
+        self.assertAlmostEqual(147.55, lmfor_models.lmfor_volume(fixture), 2)
+        self.assertEqual(0, lmfor_models.lmfor_volume(ForestStand(degree_days=720.3)))
+
+    def test_lmfor_volume_many(self):
+        stands = [ForestStand(degree_days=720.3), ForestStand(degree_days=1100.0), ForestStand(degree_days=900.0)]
+        stands[0].reference_trees = [
+            ReferenceTree(height=10.4, breast_height_diameter=20.3, species=TreeSpecies.PINE),
+            ReferenceTree(height=13.4, breast_height_diameter=14.3, species=TreeSpecies.SILVER_BIRCH)
+        ]
+        stands[2].reference_trees = [
+            ReferenceTree(height=18.2, breast_height_diameter=22.0, species=TreeSpecies.SPRUCE)
+        ]
+        totals, volumes = lmfor_models.lmfor_volume_many(stands)
+        self.assertEqual([2, 0, 1], [len(v) for v in volumes])
+        self.assertEqual([lmfor_models.lmfor_volume(stand) for stand in stands], totals.tolist())
@@ -0,0 +1,47 @@
+import multiprocessing
+import unittest
+import numpy as np
+from lukefi.metsi.data.enums.internal import TreeSpecies
+from lukefi.metsi.forestry.cross_cutting import cross_cutting_lupa
+from lukefi.metsi.forestry.cross_cutting.cross_cutting import cross_cut_many
+from lukefi.metsi.forestry.parallel import map_stands
+from tests.test_util import DEFAULT_TIMBER_PRICE_TABLE
+
+
+def stand_volume(stand: tuple[float, float]) -> tuple[float, int]:
+    d, h = stand
+    _, volumes, _ = cross_cut_many([TreeSpecies.PINE, TreeSpecies.SPRUCE], [d, d + 2], [h, h + 1], DEFAULT_TIMBER_PRICE_TABLE, impl="lupa")
+    return volumes.sum(), cross_cutting_lupa.cross_cut_lupa_many.cache_info().misses
+
+
+def failing(stand):
+    raise ValueError(stand)
+
+
+class MapStandsTest(unittest.TestCase):
+    stands = [(10.0 + i, 8.0 + i/2) for i in range(20)]
+
+    def test_results_in_order(self):
+        expected = [stand_volume(stand)[0] for stand in self.stands]
+        for processes, chunksize in ((1, 1), (2, 1), (3, 4)):
+            results = list(map_stands(stand_volume, iter(self.stands), processes, chunksize=chunksize, max_pending=2))
+            self.assertTrue(np.array_equal(expected, [r[0] for r in results]))
+
+    def test_worker_initialisation(self):
+        # the batch Lua cross-cut wrapper is built once per worker
+        context = multiprocessing.get_context("spawn")
+        results = list(map_stands(stand_volume, self.stands, 2, [DEFAULT_TIMBER_PRICE_TABLE], ["lupa"], mp_context=context))
+        self.assertEqual({1}, {r[1] for r in results})
+
+    def test_errors_are_raised(self):
+        self.assertRaises(ValueError, list, map_stands(failing, self.stands, 2))
+        self.assertRaises(ValueError, map_stands, stand_volume, self.stands, 2, chunksize=0)
+        self.assertRaises(ValueError, map_stands, stand_volume, self.stands, 0)
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "fork start method not available")
+    def test_warmed_up_backends_are_inherited_by_forked_workers(self):
+        cross_cutting_lupa.cross_cut_lupa_many.cache_clear()
+        context = multiprocessing.get_context("fork")
+        results = list(map_stands(stand_volume, self.stands, 2, [DEFAULT_TIMBER_PRICE_TABLE], ["lupa"], mp_context=context))
+        self.assertEqual({1}, {r[1] for r in results})
+        self.assertEqual(1, cross_cutting_lupa.cross_cut_lupa_many.cache_info().misses)
@@ -220,3 +220,31 @@ class TestAgeSupplementing(unittest.TestCase):
         # test that the sapling 002-002-02-1-01-tree is not included in results
         result = [tree for tree in result if tree.identifier == input_trees[0].identifier]
         self.assertEqual(0, len(result))
+
+    def test_supplement_index(self):
+        tree_values = [
+            Input(f'tree-{i}', 1 + i % 3, 5.0 + i % 17, 0.0 if i % 2 else 10 + i, 20 + i, 3.0 + i % 5)
+            for i in range(60)
+        ]
+        stratum_values = [
+            Input(f'stratum-{i}', 1 + i % 2, 0.0 if i % 4 == 0 else 6.0 + 3 * i, 5 + i, 10 + i, None)
+            for i in range(8)
+        ]
+        trees = create_test_trees(tree_values)
+        stratums = create_test_stratums(stratum_values)
+        age_trees = [t for t in trees if t.breast_height_age > 0.0]
+        index = age_sup.SupplementIndex(age_trees, stratums)
+        self.assertEqual([1, 2], sorted(index.stratums_by_species))
+        self.assertEqual(age_trees[0], index.trees_by_identifier[age_trees[0].identifier])
+        expected = []
+        for rt in create_test_trees(tree_values):
+            if rt.breast_height_age == 0.0 and rt.has_height_over_130_cm():
+                strategy = age_sup.stratum_strategy(rt, stratums)
+                if strategy.solved:
+                    stratum = age_sup.solve_stratum_supplement(rt, stratums)
+                    expected.append((rt.identifier, stratum.breast_height_age, stratum.biological_age))
+                else:
+                    supplement_tree = age_trees[[t.species for t in age_trees].index(rt.species)]
+                    expected.append((rt.identifier, supplement_tree.breast_height_age, supplement_tree.biological_age))
+        result = age_sup.supplement_age_for_reference_trees(trees, stratums)
+        self.assertEqual(expected, [(rt.identifier, rt.breast_height_age, rt.biological_age) for rt in result])
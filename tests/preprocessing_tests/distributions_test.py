@@ -54,6 +54,39 @@ class TestDistributions(test_util.ConverterTestSuite):
                 result = (tree.stems_per_ha, tree.breast_height_diameter)
                 self.assertEqual(next(asse), result)
 
+    def test_weibull_array(self):
+        cases = [
+            (3, 28.0, 27.0, 1.3, 1.0),
+            (3, 9.0, 11.0, 7.0, 0.0),
+            (10, 28.0, 27.0, 22.0, None),
+            (6, 2.068144248087615, 21.83432750499124, 23.870953862200572, 1.4901185338322862),
+        ]
+        for case in cases:
+            expected = distributions.weibull(*case)
+            stems, diameters = distributions.weibull_array(*case)
+            self.assertEqual([t.breast_height_diameter for t in expected], diameters.tolist())
+            for t, f in zip(expected, stems):
+                self.assertAlmostEqual(t.stems_per_ha, f, delta=1e-9 * t.stems_per_ha)
+            trees = distributions.reference_trees_from_arrays(stems, diameters)
+            self.assertEqual(stems.tolist(), [t.stems_per_ha for t in trees])
+            self.assertEqual(diameters.tolist(), [t.breast_height_diameter for t in trees])
+
+    def test_weibull_many(self):
+        n_samples = [3, 0, 10, 3]
+        diameter = [28.0, 10.0, 28.0, 9.0]
+        basal_area = [27.0, 5.0, 27.0, 11.0]
+        height = [1.3, 8.0, 22.0, 7.0]
+        min_diameter = [1.0, float("nan"), float("nan"), 0.0]
+        stems, diameters, offsets = distributions.weibull_many(n_samples, diameter, basal_area, height, min_diameter)
+        self.assertEqual([0, 3, 3, 13, 16], offsets.tolist())
+        for i in range(len(n_samples)):
+            md = None if i in (1, 2) else min_diameter[i]
+            expected_stems, expected_diameters = distributions.weibull_array(n_samples[i], diameter[i], basal_area[i], height[i], md)
+            self.assertEqual(expected_stems.tolist(), stems[offsets[i]:offsets[i + 1]].tolist())
+            self.assertEqual(expected_diameters.tolist(), diameters[offsets[i]:offsets[i + 1]].tolist())
+        stems, diameters, offsets = distributions.weibull_many(5, [], [], [])
+        self.assertEqual((0, 0, [0]), (len(stems), len(diameters), offsets.tolist()))
+
     def test_trees_from_simple_height_distribution(self):
         fixture = TreeStratum()
         fixture.mean_diameter = 28.0
@@ -135,3 +168,31 @@ class TestDistributions(test_util.ConverterTestSuite):
             self.assertEqual(res.sapling, True)
             self.assertEqual(res.stems_per_ha, 9.9)
             self.assertEqual(res.height, asse)
+
+    def test_predict_sapling_diameters_array(self):
+        heights = [10.0, 10.0, 10.0, 10.0, 1.0]
+        avghs = [20.0, 1.3, 1.2, 1.2, 999.0]
+        avgds = [18.0, 0.0, 0.0, 10.0, 999.0]
+        result = distributions.predict_sapling_diameters_array(heights, avghs, avgds, 1.1)
+        expected = [11.553041860956098, 13.961394503710512, 13.961394503710512, 0.0, 0.0]
+        for e, r in zip(expected, result):
+            self.assertAlmostEqual(e, r, places=12)
+
+    def test_sapling_height_distribution_many(self):
+        strata = [
+            (10.0, 99.0, 8.0, 1.1, 10),
+            (1.2, 500.0, 0.0, 0.0, 3),
+            (3.0, 2000.0, 2.5, 4.0, 1),
+            (5.0, 1500.0, 0.0, 6.0, 0),
+            (0.8, 3000.0, 0.0, 0.0, 5),
+        ]
+        heights, diameters, stems, offsets = distributions.sapling_height_distribution_many(*zip(*strata))
+        self.assertEqual([0, 10, 13, 14, 14, 19], offsets.tolist())
+        for i, (h, f, d, dom, n) in enumerate(strata):
+            expected = distributions.sapling_height_distribution(
+                TreeStratum(mean_height=h, stems_per_ha=f, mean_diameter=d), dom, n) if n > 0 else []
+            trees = slice(offsets[i], offsets[i + 1])
+            self.assertEqual([t.height for t in expected], heights[trees].tolist())
+            self.assertEqual([t.stems_per_ha for t in expected], stems[trees].tolist())
+            for t, di in zip(expected, diameters[trees]):
+                self.assertAlmostEqual(t.breast_height_diameter, di, places=12)
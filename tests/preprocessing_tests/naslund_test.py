@@ -1,3 +1,4 @@
+import math
 from lukefi.metsi.data.enums.internal import TreeSpecies
 from lukefi.metsi.forestry.preprocessing import naslund
 from tests import test_util
@@ -17,3 +18,16 @@ class TestNaslund(test_util.ConverterTestSuite):
             ([10.0, TreeSpecies.UNKNOWN], 10.38),
         ]
         self.run_with_test_assertions(assertions, naslund.naslund_height)
+
+    def test_naslund_height_array(self):
+        diameters = [0.0, 10.0, 10.0, 20.0, 10.0, 20.0, 10.0, 20.0, 10.0, -1.0, 12.3]
+        species = [
+            TreeSpecies.PINE, TreeSpecies.PINE, TreeSpecies.DOUGLAS_FIR, TreeSpecies.JUNIPER, TreeSpecies.SPRUCE,
+            TreeSpecies.SPRUCE, TreeSpecies.SILVER_BIRCH, TreeSpecies.SILVER_BIRCH, TreeSpecies.UNKNOWN,
+            TreeSpecies.SPRUCE, 0
+        ]
+        result = naslund.naslund_height_array(diameters, species)
+        self.assertTrue(math.isnan(result[0]))
+        self.assertTrue(math.isnan(result[9]))
+        expected = [naslund.naslund_height(d, spe) for d, spe in zip(diameters, species)]
+        self.assertEqual(expected[1:9] + expected[10:], result[1:9].tolist() + result[10:].tolist())
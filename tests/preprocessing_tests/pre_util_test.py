@@ -46,3 +46,8 @@ class TestPreprocessingUtils(unittest.TestCase):
 
         self.assertEqual(20.0, scaled[0].stems_per_ha)
         self.assertEqual(40.0, scaled[1].stems_per_ha)
+
+    def test_round_array(self):
+        values = [0.125, 0.375, 2.675, 1.005, 14.584999999999999, -0.125, 17.833333, 0.0]
+        self.assertEqual([round(v, 2) for v in values], pre_util.round_array(values).tolist())
+        self.assertEqual([round(v, 1) for v in values], pre_util.round_array(values, 1).tolist())
@@ -233,3 +233,28 @@ class TestTreeGeneration(unittest.TestCase):
                 self.assertEqual(asse[5], round(result[0].stems_per_ha,2))
                 self.assertEqual(asse[6], result[0].breast_height_age)
                 self.assertEqual(asse[7], result[0].biological_age)
+
+    def test_reference_trees_from_tree_strata(self):
+        stand = ForestStand()
+        stratum_inputs = [
+            self.Input(TreeSpecies.PINE, 28.0, 27.0, 22.0, 15, 16, stand, None, None),
+            self.Input(TreeSpecies.SPRUCE, 28.0, None, 22.0, 15, 16, stand, 99.0, None),
+            self.Input(TreeSpecies.PINE, None, None, None, None, None, None, None, None),
+            self.Input(TreeSpecies.SILVER_BIRCH, 12.0, 9.0, 11.0, None, 20, stand, None, None),
+            self.Input(TreeSpecies.PINE, 1.0, None, 1.2, None, 5, stand, 900.0, 900.0),
+            self.Input(TreeSpecies.SPRUCE, 0.0, None, 0.8, None, 4, stand, 1200.0, 1200.0),
+        ]
+        attributes = lambda rt: (rt.species, rt.stand, rt.stems_per_ha, rt.breast_height_diameter, rt.height,
+                                 rt.breast_height_age, rt.biological_age, rt.tree_number, rt.sapling)
+        for n_trees in (1, 10):
+            expected = [
+                attributes(rt)
+                for stratum in self.create_test_stratums(stratum_inputs)
+                for rt in tree_generation.reference_trees_from_tree_stratum(stratum, n_trees)
+            ]
+            for chunksize in (1, 4, 100):
+                chunks = list(tree_generation.reference_trees_from_tree_strata(
+                    iter(self.create_test_stratums(stratum_inputs)), n_trees, chunksize))
+                self.assertEqual(-(-len(stratum_inputs) // chunksize), len(chunks))
+                self.assertEqual(expected, [attributes(rt) for chunk in chunks for rt in chunk])
+        self.assertRaises(ValueError, next, tree_generation.reference_trees_from_tree_strata([], chunksize=0))
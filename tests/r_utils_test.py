@@ -1,10 +1,13 @@
 import unittest
+import numpy as np
 
 from lukefi.metsi.data.enums.internal import TreeSpecies
 from lukefi.metsi.data.model import ForestStand, ReferenceTree
 try:
     unrunnable = False
+    import rpy2.robjects as robjects
     import lukefi.metsi.forestry.r_utils as r_utils
+    from lukefi.metsi.forestry import lmfor_models
 except ImportError:
     unrunnable = True
 
@@ -18,5 +21,43 @@ class RUtilsTest(unittest.TestCase):
             ReferenceTree(height=13.4, breast_height_diameter=14.3, species=TreeSpecies.SILVER_BIRCH)
         ]
 
-        result = r_utils.lmfor_volume(fixture)
-        self.assertAlmostEqual(147.55, result, 2)
+        for implementation in ("py", "r"):
+            result = r_utils.lmfor_volume(fixture, implementation)
+            self.assertAlmostEqual(147.55, result, 2)
+        self.assertRaises(ValueError, r_utils.lmfor_volume, fixture, "julia")
+
+    def test_lmfor_volume_many(self):
+        stands = [ForestStand(degree_days=720.3), ForestStand(degree_days=1100.0), ForestStand(degree_days=900.0)]
+        stands[0].reference_trees = [
+            ReferenceTree(height=10.4, breast_height_diameter=20.3, species=TreeSpecies.PINE),
+            ReferenceTree(height=13.4, breast_height_diameter=14.3, species=TreeSpecies.SILVER_BIRCH)
+        ]
+        stands[2].reference_trees = [
+            ReferenceTree(height=18.2, breast_height_diameter=22.0, species=TreeSpecies.SPRUCE)
+        ]
+        for implementation in ("py", "r"):
+            totals, volumes = r_utils.lmfor_volume_many(stands, implementation)
+            self.assertEqual([2, 0, 1], [len(v) for v in volumes])
+            self.assertAlmostEqual(r_utils.lmfor_volume(stands[0], "r"), totals[0], 10)
+            self.assertEqual(0.0, totals[1])
+            self.assertAlmostEqual(r_utils.lmfor_volume(stands[2], "r"), totals[2], 10)
+
+    def test_compute_tree_volumes_parity(self):
+        trees = [(20.3, 10.4), (14.3, 13.4), (22.0, 18.2), (1.2, 1.6), (4.5, 3.1), (35.6, 27.9)]
+        dbh, h = (np.array(values) for values in zip(*trees))
+        species = ["pine", "spruce", "birch"]
+        model_types = ["climbed", "felled", "scanned"]
+        r = r_utils.get_r_with_sourced_scripts()
+        for degree_days in (720.3, 1300.0):
+            for spe in species:
+                for model_type in model_types:
+                    df = robjects.DataFrame({
+                        'height': robjects.FloatVector(h),
+                        'breast_height_diameter': robjects.FloatVector(dbh),
+                        'degree_days': robjects.FloatVector([degree_days] * len(trees)),
+                        'species': robjects.StrVector([spe] * len(trees)),
+                        'model_type': robjects.StrVector([model_type] * len(trees))
+                    })
+                    expected = np.array(list(r['compute_tree_volumes'](df)))
+                    result = lmfor_models.compute_tree_volumes(dbh, h, degree_days, [spe] * len(trees), model_type)
+                    self.assertTrue(np.allclose(expected, result, rtol=1e-10, atol=0))
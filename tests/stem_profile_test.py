@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+from parameterized import parameterized
+from lukefi.metsi.forestry.cross_cutting import stem_profile
+
+
+class StemProfileTest(unittest.TestCase):
+
+    @parameterized.expand([
+        ("pine", 30.0, 25),
+        ("spruce", 17.721245087039236, 16),
+        ("birch", 15.57254199723247, 18),
+        ("birch", 60.0, 35),
+        ("pine", 5.0, 4)
+    ])
+    def test_analytic_volume_equals_quad_volume(self, species, dbh, height):
+        n = int((height*100)/10-1)
+        quad = stem_profile.create_tree_stem_profile(species, dbh, height, n, integration="quad")
+        analytic = stem_profile.create_tree_stem_profile(species, dbh, height, n, integration="analytic")
+        self.assertEqual((n, 3), analytic.shape)
+        self.assertTrue(np.allclose(quad, analytic, rtol=1e-10, atol=1e-12))
+
+    def test_unknown_integration(self):
+        self.assertRaises(ValueError, stem_profile.create_tree_stem_profile, "pine", 30.0, 25, 249, integration="quadd")
+
+
+class StemProfileCacheTest(unittest.TestCase):
+
+    def test_cached_profile_equals_computed_profile(self):
+        cache = stem_profile.StemProfileCache()
+        T = cache.get("pine", 30.0, 25, 249)
+        self.assertTrue(np.array_equal(stem_profile.create_tree_stem_profile("pine", 30.0, 25, 249), T))
+        self.assertFalse(T.flags.writeable)
+        self.assertIs(T, cache.get("pine", 30.0, 25, 249))
+        cache.get("spruce", 30.0, 25, 249)
+        info = cache.cache_info()
+        self.assertEqual((1, 2, 0, 2, 2 * 249 * 3 * 8), (info.hits, info.misses, info.evictions, info.currsize, info.nbytes))
+
+    def test_memory_budget(self):
+        cache = stem_profile.StemProfileCache(max_bytes=2 * 249 * 3 * 8)
+        for d in (20.0, 21.0, 22.0):
+            cache.get("birch", d, 25, 249)
+        info = cache.cache_info()
+        self.assertEqual((0, 3, 1, 2), (info.hits, info.misses, info.evictions, info.currsize))
+        cache.get("birch", 20.0, 25, 249)
+        self.assertEqual(2, cache.cache_info().evictions)
+        cache.cache_clear()
+        self.assertEqual((0, 0, 0, 0, 2 * 249 * 3 * 8, 0), tuple(cache.cache_info()))
+
+    def test_float32_profiles(self):
+        cache = stem_profile.StemProfileCache(dtype=np.float32)
+        T = cache.get("spruce", 17.7, 16, 159)
+        self.assertEqual(np.float32, T.dtype)
+        self.assertEqual(159 * 3 * 4, cache.cache_info().nbytes)
+
+    def test_unknown_integration(self):
+        cache = stem_profile.StemProfileCache()
+        self.assertRaises(ValueError, cache.get, "pine", 30.0, 25, 249, integration="Analytic")
+        self.assertEqual(0, cache.cache_info().currsize)
@@ -27,3 +27,61 @@ class ThinningTest(unittest.TestCase):
         self.assertEqual(171.747, round(stand.reference_trees[0].stems_per_ha, 3))
         self.assertEqual(172.606, round(stand.reference_trees[1].stems_per_ha, 3))
         self.assertEqual(173.464, round(stand.reference_trees[2].stems_per_ha, 3))
+
+    def _stand(self, n: int = 3) -> ForestStand:
+        stand = ForestStand()
+        stand.reference_trees = [
+            ReferenceTree(species=TreeSpecies(1 + i % 3), breast_height_diameter=20.0 + i, stems_per_ha=200.0 + i, identifier=f"tree-{i + 1}")
+            for i in range(n)
+        ]
+        return stand
+
+    def test_analytic_thinning_equals_iterative_thinning(self):
+        cases = [
+            (0.97, thinning.BasalAreaBound(18.0), lambda i, n, c: 0),
+            (0.99, thinning.BasalAreaBound(7.5), lambda i, n, c: (1 - c) * i / n),
+            (0.995, thinning.StemCountBound(1000.0), lambda i, n, c: 0),
+            (0.9, thinning.StemCountBound(35.0), lambda i, n, c: (1 - c) * i / n),
+        ]
+        for thinning_factor, bound, extra_factor_solver in cases:
+            expected = thinning.iterative_thinning(self._stand(20), thinning_factor, bound, extra_factor_solver)
+            result = thinning.analytic_thinning(self._stand(20), thinning_factor, bound, extra_factor_solver)
+            self.assertEqual([rt.stems_per_ha for rt in expected.reference_trees], [rt.stems_per_ha for rt in result.reference_trees])
+        stand = thinning.analytic_thinning(self._stand(), 0.97, thinning.BasalAreaBound(18.0), lambda i, n, c: 0)
+        self.assertEqual(171.747, round(stand.reference_trees[0].stems_per_ha, 3))
+
+    def test_analytic_thinning_falls_back_to_iterative_thinning(self):
+        thin_predicate = lambda stand: 18.0 < futil.overall_basal_area(stand.reference_trees)
+        expected = thinning.iterative_thinning(self._stand(), 0.97, thin_predicate, lambda i, n, c: 0)
+        result = thinning.analytic_thinning(self._stand(), 0.97, thin_predicate, lambda i, n, c: 0)
+        self.assertEqual([rt.stems_per_ha for rt in expected.reference_trees], [rt.stems_per_ha for rt in result.reference_trees])
+
+    def test_analytic_thinning_unreachable_bound(self):
+        self.assertRaises(ValueError, thinning.analytic_thinning, self._stand(), 0.97, thinning.StemCountBound(100.0), lambda i, n, c: 0.05)
+
+    def test_incremental_thinning(self):
+        cases = [
+            (0.97, thinning.BasalAreaBound(18.0), lambda i, n, c: 0),
+            (0.9, thinning.StemCountBound(35.0), lambda i, n, c: (1 - c) * i / n),
+        ]
+        for thinning_factor, bound, extra_factor_solver in cases:
+            expected = thinning.iterative_thinning(self._stand(20), thinning_factor, bound, extra_factor_solver)
+            stand = self._stand(20)
+            initial_basal_area = futil.overall_basal_area(stand.reference_trees)
+            initial_stems = futil.overall_stems_per_ha(stand.reference_trees)
+            result, state = thinning.incremental_thinning(
+                stand, thinning_factor, bound, extra_factor_solver, stem_volume=lambda rt: 0.01 * rt.breast_height_diameter)
+            self.assertEqual([rt.stems_per_ha for rt in expected.reference_trees], [rt.stems_per_ha for rt in result.reference_trees])
+            self.assertAlmostEqual(futil.overall_basal_area(result.reference_trees), state.basal_area, places=9)
+            self.assertAlmostEqual(futil.overall_stems_per_ha(result.reference_trees), state.stems_per_ha, places=9)
+            self.assertAlmostEqual(initial_basal_area - state.basal_area, state.removed_basal_area, places=9)
+            self.assertAlmostEqual(initial_stems - state.stems_per_ha, state.removed_stems_per_ha, places=9)
+            removed_volume = sum(0.01 * rt.breast_height_diameter * (f0.stems_per_ha - rt.stems_per_ha)
+                                 for rt, f0 in zip(result.reference_trees, self._stand(20).reference_trees))
+            self.assertAlmostEqual(removed_volume, state.removed_volume, places=9)
+
+    def test_incremental_thinning_custom_predicate(self):
+        _, state = thinning.incremental_thinning(
+            self._stand(), 0.9, lambda state: state.removed_stems_per_ha < 100.0, lambda i, n, c: 0)
+        self.assertLessEqual(100.0, state.removed_stems_per_ha)
+        self.assertRaises(ValueError, thinning.incremental_thinning, self._stand(), 1.0, lambda state: True, lambda i, n, c: 0)
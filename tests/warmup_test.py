@@ -0,0 +1,20 @@
+import unittest
+from lukefi.metsi.forestry.cross_cutting import cross_cutting_lupa
+from lukefi.metsi.forestry.warmup import warmup
+from tests.test_util import DEFAULT_TIMBER_PRICE_TABLE, TIMBER_PRICE_TABLE_THREE_GRADES
+
+
+class WarmupTest(unittest.TestCase):
+    def test_warmup(self):
+        cross_cutting_lupa.cross_cut_lupa.cache_clear()
+        cross_cutting_lupa.cross_cut_lupa_many.cache_clear()
+        timings = warmup([DEFAULT_TIMBER_PRICE_TABLE, TIMBER_PRICE_TABLE_THREE_GRADES], ["py", "lupa"])
+        self.assertEqual(["py", "lupa"], list(timings.keys()))
+        self.assertTrue(all(t >= 0 for t in timings.values()))
+        self.assertEqual(2, cross_cutting_lupa.cross_cut_lupa.cache_info().currsize)
+        self.assertEqual(2, cross_cutting_lupa.cross_cut_lupa_many.cache_info().currsize)
+        warmup([DEFAULT_TIMBER_PRICE_TABLE], ["lupa"])
+        self.assertEqual(2, cross_cutting_lupa.cross_cut_lupa.cache_info().misses)
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, warmup, [DEFAULT_TIMBER_PRICE_TABLE], ["lupa", "julia"])